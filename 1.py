@@ -1,15 +1,8 @@
 import streamlit as st
-import pickle
 import pandas as pd
 from sklearn.preprocessing import StandardScaler
-
-# Load models
-model1 = pickle.load(open('best_model_non5.pkl', 'rb'))
-model2 = pickle.load(open('best_model_int7.9.pkl', 'rb'))
-
-# Load Scaler object (only once)
-with open('scaler.pkl', 'rb') as f:
-    scaler = pickle.load(f)
+from model_registry import load_for_student_type, readiness
+from explanations import global_top_factors
 
 # Page configuration
 st.set_page_config(
@@ -28,6 +21,13 @@ st.markdown("""
 # Button to choose Domestic or International students
 student_type = st.sidebar.radio("Select student type", ('Domestic', 'International'))
 
+# Load the Scaler object and only the model the selected student type needs;
+# the other model warms up in the background (once per server process)
+model1, model2, scaler = load_for_student_type(student_type)
+for other_type, status in readiness().items():
+    if status != 'ready':
+        st.sidebar.caption(f'{other_type} model: {status}...')
+
 st.sidebar.subheader('Input features for single prediction')
 # Use columns to divide into two parts
 col1, col2 = st.sidebar.columns(2)
@@ -146,18 +146,10 @@ if st.sidebar.button('Predict'):
         # Impact factors ranking display
         st.markdown("<h2 style='color: darkblue;font-size: 24px;'>Impact factors ranking:</h2>", unsafe_allow_html=True)
 
-        col1, col2, col3, col4, col5 = st.columns([4, 4, 2, 2, 2])  
-
-        with col1:
-            st.markdown("<p style='font-size: 20px;'>1. 2nd semester approved course.</p>", unsafe_allow_html=True)
-        with col2:  
-            st.markdown("<p style='font-size: 20px;'>2. 1st semester approved course.</p>", unsafe_allow_html=True)
-        with col3:  
-            st.markdown("<p style='font-size: 20px;'>3. Tuition fee.</p>", unsafe_allow_html=True)
-        with col4:  
-            st.markdown("<p style='font-size: 20px;'>4. Course type.</p>", unsafe_allow_html=True)
-        with col5:  
-            st.markdown("<p style='font-size: 20px;'>5. Debtor.</p>", unsafe_allow_html=True)
+        # Globally most important features of the model used above
+        for rank, (col, label) in enumerate(zip(st.columns(5), global_top_factors('model2' if student_type == 'International' else 'model1')), 1):
+            with col:
+                st.markdown(f"<p style='font-size: 20px;'>{rank}. {label}.</p>", unsafe_allow_html=True)
 
     except ValueError as e:
         st.error(f"Invalid input value: {e}")
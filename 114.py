@@ -1,15 +1,38 @@
+import io
 import streamlit as st
-import pickle
 import pandas as pd
+import matplotlib.pyplot as plt
 from sklearn.preprocessing import StandardScaler
+from model_registry import load_models
+from gbm_engine import flat_model1
+from lr_engine import fused_model2
+from batch_scoring import CHUNK_ROWS, dedup_ratio, international_attributions, score_file
+from micro_batcher import get_batcher
+from parallel_scoring import get_parallel_model1
+from prediction_cache import artifact_signature, prediction_cache
+from stage_timer import RerunTimer, metrics
+from gbm_shap import shap_model1
+from explanations import global_top_factors, model1_attributions, model2_attributions, top_drivers
+from features import FEATURE_COLUMNS, FEATURE_LABELS
+from what_if import risk_surface, sweep
+from counterfactual import counterfactual
 
-# Load models
-model1 = pickle.load(open('best_model_non5.pkl', 'rb'))
-model2 = pickle.load(open('best_model_int7.9.pkl', 'rb'))
+# Per-stage latency of this rerun
+timer = RerunTimer()
 
-# Load Scaler object (only once)
-with open('scaler.pkl', 'rb') as f:
-    scaler = pickle.load(f)
+with timer.stage('load_models'):
+    # Load models and Scaler object (once per server process, shared by all sessions)
+    model1, model2, scaler = load_models()
+    # Build the flat-array model1 the batcher scores clicks with
+    flat_model1()
+    # model1 spread over SCORING_WORKERS processes for large uploads
+    cohort_model1 = get_parallel_model1()
+    # model2 with the scaler folded in; scores raw feature values directly
+    fast_model2 = fused_model2()
+    # Shared queue that scores concurrent sessions' Predict clicks together
+    batcher = get_batcher()
+    # Leaf paths for model1's TreeSHAP ranking, so the first Predict is fast too
+    shap_model1()
 
 # Page configuration
 st.set_page_config(
@@ -56,40 +79,54 @@ with col2:
     Inflation = st.slider("Inflation rate", -0.8, 3.7, 1.0)
     GDP = st.slider("GDP", -4.06, 3.51, 1.00)
 
+# The current student, in the models' feature order
+student_features = [Marital, Mode, Order, Course, Attendance, Qualification, Nationality,
+                    Mother_Q, Father_Q, Mother_O, Father_O, Displaced, Need, Debtor,
+                    Fee, Gender, Scholarship, Age, First, Second, Unemployment, Inflation, GDP]
+
 if st.sidebar.button('Predict'):
 
-    # Input features for prediction
-    input_features = [[Marital, Mode, Order, Course, Attendance, Qualification, Nationality,
-                       Mother_Q, Father_Q, Mother_O, Father_O, Displaced, Need, Debtor,
-                       Fee, Gender, Scholarship, Age, First, Second, Unemployment, Inflation, GDP]]
-    
-    # Create DataFrame
-    new_data = pd.DataFrame(input_features, columns=['Marital', 'Mode', 'Order', 'Course', 'Attendance', 'Qualification',
-                                                     'Nationality', 'Mother_Q', 'Father_Q', 'Mother_O', 'Father_O',
-                                                     'Displaced', 'Need', 'Debtor', 'Fee', 'Gender', 'Scholarship',
-                                                     'Age', 'First', 'Second', 'Unemployment', 'Inflation', 'GDP'])
+    with timer.stage('build_data'):
+        # Input features for prediction
+        input_features = [student_features]
 
-    # Standardize the input features
-    feature_values_scaled = scaler.transform(new_data.values)
+        # Create DataFrame
+        new_data = pd.DataFrame(input_features, columns=['Marital', 'Mode', 'Order', 'Course', 'Attendance', 'Qualification',
+                                                         'Nationality', 'Mother_Q', 'Father_Q', 'Mother_O', 'Father_O',
+                                                         'Displaced', 'Need', 'Debtor', 'Fee', 'Gender', 'Scholarship',
+                                                         'Age', 'First', 'Second', 'Unemployment', 'Inflation', 'GDP'])
 
     try:
         # Select model based on Nationality value
         if 2 <= Nationality <= 21:  # Use model2 if Nationality value is between 2 and 21
-            prediction = model2.predict(feature_values_scaled)
+            with timer.stage('predict'):
+                prediction, _ = prediction_cache.get_or_compute(
+                    'model2', new_data.values[0], lambda: batcher.predict('model2', new_data.values))
             st.markdown("<h1 style='color: blue; font-size: 30px;'>International students result:</h1>", unsafe_allow_html=True)
         else:  # Otherwise use model1
-            prediction = model1.predict(feature_values_scaled)
+            with timer.stage('predict'):
+                prediction, _ = prediction_cache.get_or_compute(
+                    'model1', new_data.values[0], lambda: batcher.predict('model1', new_data.values))
             st.markdown("<h1 style='color: blue; font-size: 30px;'>Domestic students result:</h1>", unsafe_allow_html=True)
 
         if prediction[0] == 1:
             st.success("Predicted outcome: Dropout")
+
+            # Smallest change of the actionable sliders that predicts Graduate
+            with timer.stage('counterfactual'):
+                result = counterfactual(new_data.values[0], 'model2' if 2 <= Nationality <= 21 else 'model1')
+            if result['changes']:
+                changes = ', '.join(f'{FEATURE_LABELS[column]}: {old:g} → {new:g}' for column, old, new in result['changes'])
+                st.info(f"Smallest change to Graduate: {changes} (Dropout probability {result['probability']:.2f}).")
+            else:
+                st.info('No change of up to three actionable sliders predicts Graduate.')
         elif prediction[0] == 0:
             st.success("Predicted outcome: Graduated")
             
             # Center the columns
             col1, col2 = st.columns([4, 2])  # Center column is larger
 
-            with col1:
+            with col1, timer.stage('format_rows'):
                 # Modify to display feature names and values in two columns
                 rows = []
                 for i in range(0, len(new_data.columns), 2):
@@ -106,7 +143,7 @@ if st.sidebar.button('Predict'):
                 rows_df = pd.DataFrame(rows, columns=['Line 1', 'Line 2'])
                 st.dataframe(rows_df, use_container_width=True)
 
-            with col2:
+            with col2, timer.stage('image'):
                 st.image("Graduate_student.jpg", caption="Graduate Student")  # Display image
 
         else:
@@ -115,21 +152,146 @@ if st.sidebar.button('Predict'):
         # Impact factors ranking display
         st.markdown("<h2 style='color: darkblue;font-size: 24px;'>Impact factors ranking:</h2>", unsafe_allow_html=True)
 
-        col1, col2, col3, col4, col5 = st.columns([4, 4, 2, 2, 2])  
+        # The five features that moved this student's prediction most
+        # (TreeSHAP for model1, exact linear contributions for model2)
+        with timer.stage('explain'):
+            if 2 <= Nationality <= 21:
+                attributions = model2_attributions(new_data.values[0])
+            else:
+                attributions = model1_attributions(new_data.values[0])
+            drivers = [f'{label} ({value:+.2f})' for label, value in top_drivers(attributions)]
+        st.caption('Contribution to the log-odds of Dropout; positive values push towards Dropout.')
 
-        with col1:
-            st.markdown("<p style='font-size: 20px;'>1. 2nd semester approved course.</p>", unsafe_allow_html=True)
-        with col2:  
-            st.markdown("<p style='font-size: 20px;'>2. 1st semester approved course.</p>", unsafe_allow_html=True)
-        with col3:  
-            st.markdown("<p style='font-size: 20px;'>3. Tuition fee.</p>", unsafe_allow_html=True)
-        with col4:  
-            st.markdown("<p style='font-size: 20px;'>4. Course type.</p>", unsafe_allow_html=True)
-        with col5:  
-            st.markdown("<p style='font-size: 20px;'>5. Debtor.</p>", unsafe_allow_html=True)
+        for rank, (col, driver) in enumerate(zip(st.columns(5), drivers), 1):
+            with col:
+                st.markdown(f"<p style='font-size: 20px;'>{rank}. {driver}.</p>", unsafe_allow_html=True)
 
     except ValueError as e:
         st.error(f"Invalid input value: {e}")
     except Exception as e:
         st.error(f"An error occurred: {e}")
 
+
+def figure_png(fig):
+    # Render once to PNG and free the figure; reruns show the cached bytes
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format='png', bbox_inches='tight')
+    plt.close(fig)
+    return buffer.getvalue()
+
+
+def models_signature():
+    # Changes when either model or the scaler is reloaded, invalidating the plots
+    return artifact_signature('model1'), artifact_signature('model2')
+
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def what_if_png(features, column, signature):
+    curve = sweep(list(features), column)
+    fig, ax = plt.subplots(figsize=(8, 3))
+    curve.plot(ax=ax)
+    ax.axvline(features[FEATURE_COLUMNS.index(column)], color='grey', linestyle=':', label='Current value')
+    ax.axhline(0.5, color='red', linestyle='--', linewidth=1)
+    ax.set_xlabel(FEATURE_LABELS[column])
+    ax.set_ylabel('Dropout probability')
+    ax.set_ylim(0, 1)
+    ax.legend()
+    return figure_png(fig)
+
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def risk_surface_png(features, surface_model, signature):
+    surface = risk_surface(list(features))[surface_model]
+    fig, ax = plt.subplots(figsize=(8, 4))
+    image = ax.imshow(surface.values, origin='lower', aspect='auto', cmap='RdYlGn_r', vmin=0, vmax=1,
+                      extent=(surface.columns[0] - 0.5, surface.columns[-1] + 0.5,
+                              surface.index[0] - 0.5, surface.index[-1] + 0.5))
+    ax.contour(surface.columns, surface.index, surface.values, levels=[0.5], colors='black', linewidths=1)
+    ax.plot(features[FEATURE_COLUMNS.index('Second')], features[FEATURE_COLUMNS.index('First')],
+            marker='*', markersize=14, color='white', markeredgecolor='black')
+    ax.set_xlabel(FEATURE_LABELS['Second'])
+    ax.set_ylabel(FEATURE_LABELS['First'])
+    fig.colorbar(image, ax=ax, label='Dropout probability')
+    return figure_png(fig)
+
+
+# What-if analysis: the current student's risk over the whole range of one
+# feature, scored in one batched call per model instead of one rerun per value.
+# Built only while the toggle is on; the rendered image is cached per input
+with st.expander('What-if analysis'):
+    what_if_column = st.selectbox('Feature to vary', FEATURE_COLUMNS, index=FEATURE_COLUMNS.index('Second'),
+                                  format_func=FEATURE_LABELS.get)
+    if st.toggle('Show what-if curve', key='show_what_if'):
+        with timer.stage('what_if'):
+            st.image(what_if_png(tuple(student_features), what_if_column, models_signature()))
+        st.caption(f"This student is scored with the {'International' if 2 <= Nationality <= 21 else 'Domestic'} model; "
+                   "above the red line the outcome is Dropout.")
+
+
+# Risk surface: every combination of the two semester results for the current
+# student; the grid is cached on the other 21 features and the image on all 23
+with st.expander('Risk surface: 1st x 2nd semester approved courses'):
+    surface_model = 'International model' if 2 <= Nationality <= 21 else 'Domestic model'
+    if st.toggle('Show risk surface', key='show_risk_surface'):
+        with timer.stage('risk_surface'):
+            st.image(risk_surface_png(tuple(student_features), surface_model, models_signature()))
+        st.caption(f'{surface_model}; the black line is the 0.5 decision boundary and the star is the current student.')
+
+
+# Overall impact factors of the deployed models, derived once per loaded model
+with st.sidebar.expander('Overall impact factors'):
+    st.dataframe(pd.DataFrame({'Domestic': global_top_factors('model1'), 'International': global_top_factors('model2')},
+                              index=range(1, 6)), use_container_width=True)
+
+
+# Batch prediction for a whole intake uploaded as CSV/Excel
+@st.cache_data(show_spinner='Scoring uploaded students...')
+def score_upload(data, filename, both_models=False):
+    # One chunk per worker, so every chunk keeps the whole pool busy
+    return score_file(io.BytesIO(data), filename, scaler, cohort_model1, fast_model2,
+                      chunk_rows=CHUNK_ROWS * cohort_model1.workers, both_models=both_models)
+
+
+st.sidebar.subheader('Batch prediction')
+uploaded_file = st.sidebar.file_uploader('Upload students (CSV or Excel)', type=['csv', 'xlsx', 'xls'])
+# Like 18.py: every student through both models instead of the Nationality route
+both_models = st.sidebar.checkbox('Score with both models')
+
+if uploaded_file is not None:
+    try:
+        results_df = score_upload(uploaded_file.getvalue(), uploaded_file.name, both_models)
+        st.markdown("<h1 style='color: blue; font-size: 30px;'>Batch prediction result:</h1>", unsafe_allow_html=True)
+        invalid = results_df.attrs['invalid_rows']
+        scored = len(results_df) - len(invalid)
+        if both_models:
+            dropouts = {model: int((results_df[f'{model} outcome'] == 'Dropout').sum())
+                        for model in ('Domestic', 'International')}
+            st.success(f"{scored} students scored, {dropouts['Domestic']} predicted Dropout by the "
+                       f"Domestic model and {dropouts['International']} by the International model.")
+        else:
+            dropouts = int((results_df['Outcome'] == 'Dropout').sum())
+            st.success(f"{scored} students scored, {dropouts} predicted Dropout.")
+        if invalid:
+            st.warning(f"{len(invalid)} rows with missing or infinite values were not scored: data rows "
+                       f"{', '.join(str(row + 1) for row in invalid[:20])}{' ...' if len(invalid) > 20 else ''}.")
+        st.caption(f"{results_df.attrs['distinct_rows']} distinct feature vectors scored "
+                   f"(dedup ratio {dedup_ratio(results_df):.1f}x).")
+        st.dataframe(results_df.head(100), use_container_width=True)
+        st.download_button('Download predictions (CSV)', results_df.to_csv(index=False).encode('utf-8'),
+                           file_name='batch_predictions.csv', mime='text/csv')
+        if not both_models and (results_df['Student Type'] == 'International').any():
+            attributions_df = international_attributions(results_df, fast_model2)
+            st.download_button('Download international impact factors (CSV)',
+                               attributions_df.to_csv(index=False).encode('utf-8'),
+                               file_name='international_impact_factors.csv', mime='text/csv')
+    except ValueError as e:
+        st.error(f"Invalid input file: {e}")
+    except Exception as e:
+        st.error(f"An error occurred: {e}")
+
+# Record this rerun's stage timings; add ?debug=1 to the URL to see them
+timer.finish()
+if st.query_params.get('debug') == '1':
+    with st.sidebar.expander('Debug: stage latency'):
+        latency_df = pd.DataFrame.from_dict(metrics.summary(), orient='index')
+        st.dataframe(latency_df.round(3), use_container_width=True)
@@ -1,16 +1,13 @@
 import streamlit as st
-import pickle
 import pandas as pd
 from sklearn.preprocessing import StandardScaler
-import os
-
-# Load models
-model1 = pickle.load(open('best_model_non5.pkl', 'rb'))  # Domestic model
-model2 = pickle.load(open('best_model_int7.9.pkl', 'rb'))  # International model
-
-# Load Scaler object (only once)
-with open('scaler.pkl', 'rb') as f:
-    scaler = pickle.load(f)
+from model_registry import load_for_student_type, load_models, readiness
+from lr_engine import fused_model2
+from prediction_logger import get_prediction_logger
+from prediction_history import ParquetSink
+from prediction_store import SqliteSink
+import prediction_history
+import prediction_store
 
 # Page configuration
 st.set_page_config(
@@ -31,6 +28,13 @@ st.sidebar.markdown('<h2 style="font-size: 24px;">Select student type</h2>', uns
 # Radio button for selecting student type
 student_type = st.sidebar.radio("", ('Domestic', 'International'))
 
+# Load the Scaler object and the model the selected student type needs; the
+# other model warms up in the background (once per server process)
+model1, model2, scaler = load_for_student_type(student_type)
+for other_type, status in readiness().items():
+    if status != 'ready':
+        st.sidebar.caption(f'{other_type} model: {status}...')
+
 # Use columns to divide into two parts
 col1, col2 = st.sidebar.columns(2)
 
@@ -65,6 +69,9 @@ with col2:
     Inflation = st.slider("Inflation rate", -0.8, 3.7, 1.0)
     GDP = st.slider("GDP", -4.06, 3.51, 1.00)
 
+# Main area: this prediction, and past predictions from the prediction log
+predict_tab, history_tab = st.tabs(['Prediction', 'History'])
+
 # Predict button
 if st.sidebar.button('Predict'):
 
@@ -79,15 +86,20 @@ if st.sidebar.button('Predict'):
                                                      'Displaced', 'Need', 'Debtor', 'Fee', 'Gender', 'Scholarship',
                                                      'Age', 'First', 'Second', 'Unemployment', 'Inflation', 'GDP'])
 
+    # Both result columns are shown, so wait for a model still warming up
+    model1, model2, scaler = load_models()
+
     # Standardize the input features
     feature_values_scaled = scaler.transform(new_data.values)
 
     try:
-        col1, col2 = st.columns([4, 4])  # Left column for Domestic, right column for International
+        col1, col2 = predict_tab.columns([4, 4])  # Left column for Domestic, right column for International
 
         # Domestic Student Prediction (Left Column)
         with col1:
             prediction = model1.predict(feature_values_scaled)
+            probability = model1.predict_proba(feature_values_scaled)[0, 1]
+            model_id = 'model1'
             st.markdown("<h1 style='color: blue; font-size: 30px;'>Domestic students result:</h1>", unsafe_allow_html=True)
 
             if prediction[0] == 1:
@@ -111,7 +123,11 @@ if st.sidebar.button('Predict'):
         # International Student Prediction (Right Column)
         with col2:
             if 2 <= Nationality <= 21:  # Use model2 if Nationality value is between 2 and 21
-                prediction = model2.predict(feature_values_scaled)
+                # The pycaret pipeline rejects a bare array; the fused model
+                # applies the scaler itself and takes the raw feature values
+                prediction, probabilities = fused_model2().predict_with_proba(new_data.values)
+                probability = probabilities[0]
+                model_id = 'model2'
                 st.markdown("<h1 style='color: blue; font-size: 30px;'>International students result:</h1>", unsafe_allow_html=True)
 
                 if prediction[0] == 1:
@@ -143,22 +159,59 @@ if st.sidebar.button('Predict'):
         
         prediction_result = {
             "Student Type": student_type,
+            "Model": model_id,
             "Outcome": outcome,
+            "Probability": float(probability),
             "Features": new_data.to_dict(orient='records')[0]
         }
 
-        # Create folder if it doesn't exist
-        output_folder = "predictions"
-        if not os.path.exists(output_folder):
-            os.makedirs(output_folder)
-
-        # Save the prediction result to a CSV file
-        results_df = pd.DataFrame([prediction_result])
-        results_df.to_csv(os.path.join(output_folder, 'prediction_results.csv'), mode='a', header=not os.path.exists(os.path.join(output_folder, 'prediction_results.csv')), index=False)
+        # Queue the prediction result; a background writer stores it in
+        # the prediction history (predictions/history)
+        get_prediction_logger().log(prediction_result)
 
-        st.success("Prediction results saved successfully.")
+        predict_tab.success("Prediction results saved successfully.")
 
     except ValueError as e:
-        st.error(f"Invalid input value: {e}")
+        predict_tab.error(f"Invalid input value: {e}")
     except Exception as e:
-        st.error(f"An error occurred: {e}")
+        predict_tab.error(f"An error occurred: {e}")
+
+# Prediction history, filtered and paged in the store the logger writes to
+# (Parquet by default, SQLite with PREDICTION_LOG_SINK=sqlite)
+HISTORY_PAGE_SIZE = 50
+
+with history_tab:
+    sink = get_prediction_logger().sink
+    if isinstance(sink, SqliteSink):
+        query_history, history_source = prediction_store.query_history, {'path': sink.path}
+    elif isinstance(sink, ParquetSink):
+        query_history, history_source = prediction_history.query_history, {'root': sink.root}
+    else:
+        query_history = None
+    if query_history is None:
+        st.info('The CSV log has no history view. Run the app with PREDICTION_LOG_SINK=parquet or sqlite.')
+    else:
+        h1, h2, h3 = st.columns(3)
+        history_type = h1.selectbox('Student type', ('All', 'Domestic', 'International'), key='history_type')
+        history_course = h2.selectbox('Course type', ['All'] + list(range(1, 18)), key='history_course')
+        history_dates = h3.date_input('Logged between', (), key='history_dates')
+        start_date, end_date = (list(history_dates) + [None, None])[:2]
+        # Cursor of every page shown so far; a filter change starts over
+        history_filters = (history_type, history_course, start_date, end_date)
+        if st.session_state.get('history_filters') != history_filters:
+            st.session_state.history_filters = history_filters
+            st.session_state.history_cursors = [None]
+        history_cursors = st.session_state.history_cursors
+        history_rows, next_cursor = query_history(None if history_type == 'All' else history_type,
+                                                  None if history_course == 'All' else history_course,
+                                                  start_date, end_date, cursor=history_cursors[-1],
+                                                  page_size=HISTORY_PAGE_SIZE, **history_source)
+        st.caption(f'Page {len(history_cursors)}, {len(history_rows)} predictions, newest first')
+        st.dataframe(pd.DataFrame(history_rows), use_container_width=True)
+        newer, older = st.columns(2)
+        if newer.button('Newer', key='history_newer', disabled=len(history_cursors) == 1):
+            history_cursors.pop()
+            st.rerun()
+        if older.button('Older', key='history_older', disabled=next_cursor is None):
+            history_cursors.append(next_cursor)
+            st.rerun()
@@ -1,15 +1,10 @@
 import streamlit as st
-import pickle
 import pandas as pd
 from sklearn.preprocessing import StandardScaler
+from model_registry import load_models
 
-# Load models
-model1 = pickle.load(open('best_model_non5.pkl', 'rb'))
-model2 = pickle.load(open('best_model_int7.9.pkl', 'rb'))
-
-# Load Scaler object (only once)
-with open('scaler.pkl', 'rb') as f:
-    scaler = pickle.load(f)
+# Load models and Scaler object (once per server process, shared by all sessions)
+model1, model2, scaler = load_models()
 
 # Page configuration
 st.set_page_config(
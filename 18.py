@@ -1,15 +1,20 @@
 import streamlit as st
-import pickle
 import pandas as pd
 from sklearn.preprocessing import StandardScaler
+from model_registry import readiness, registry
+from explanations import model1_attributions, model2_attributions, top_drivers
+from gbm_engine import flat_model1
+from lr_engine import fused_model2
+from incremental import IncrementalScorer
 
-# Load models
-model1 = pickle.load(open('best_model_non5.pkl', 'rb'))
-model2 = pickle.load(open('best_model_int7.9.pkl', 'rb'))
+# Load models and Scaler object in the background (once per server process,
+# shared by all sessions), so the first page renders without waiting for them
+registry.warm_up('scaler', 'model1', 'model2')
 
-# Load Scaler object (only once)
-with open('scaler.pkl', 'rb') as f:
-    scaler = pickle.load(f)
+# Per-session scorer: a rerun only redoes the work of the sliders that moved
+if 'scorer' not in st.session_state:
+    st.session_state.scorer = IncrementalScorer()
+scorer = st.session_state.scorer
 
 # Page configuration
 st.set_page_config(
@@ -29,6 +34,9 @@ st.sidebar.subheader('Input features for single prediction')
 st.sidebar.markdown('<h2 style="font-size: 24px;">Select student type</h2>', unsafe_allow_html=True)
 # Radio button for selecting student type
 student_type = st.sidebar.radio("", ('Domestic', 'International'))
+for model_type, status in readiness().items():
+    if status != 'ready':
+        st.sidebar.caption(f'{model_type} model: {status}...')
 
 # Use columns to divide into two parts
 col1, col2 = st.sidebar.columns(2)
@@ -76,20 +84,22 @@ if st.sidebar.button('Predict'):
                                                      'Displaced', 'Need', 'Debtor', 'Fee', 'Gender', 'Scholarship',
                                                      'Age', 'First', 'Second', 'Unemployment', 'Inflation', 'GDP'])
 
-    # Standardize the input features
-    feature_values_scaled = scaler.transform(new_data.values)
+    # Build the engines behind the incremental scorer (once per loaded model),
+    # waiting for models still warming up
+    flat_model1()
+    fused_model2()
 
 try:
     col1, col2, col3 = st.columns([5, 1, 5])  # Left column for Domestic, right column for International
 
     # Domestic Student Prediction (Left Column)
     with col1:
-        prediction = model1.predict(feature_values_scaled)
+        prediction, _ = scorer.predict_with_proba('model1', new_data.values[0])
         st.markdown("<h1 style='color: blue; font-size: 30px;'>Domestic students result:</h1>", unsafe_allow_html=True)
         
-        if prediction[0] == 1:
+        if prediction == 1:
             st.markdown(f"<h2 style='font-size: 36px; color: green;'> Dropout！</h2>", unsafe_allow_html=True)
-        elif prediction[0] == 0:
+        elif prediction == 0:
             st.markdown(f"<h2 style='font-size: 36px; color: green;'>Graduate！</h2>", unsafe_allow_html=True)
 
         # Display features and values for Domestic students
@@ -105,16 +115,22 @@ try:
         rows_df = pd.DataFrame(rows, columns=['Line 1', 'Line 2'])
         st.dataframe(rows_df, use_container_width=True)
 
+        # The five features that moved this student's prediction most (TreeSHAP)
+        drivers = top_drivers(model1_attributions(new_data.values[0]))
+        for rank, (label, value) in enumerate(drivers, 1):
+            st.markdown(f"<p style='font-size: 20px;'>{rank}. {label} ({value:+.2f}).</p>", unsafe_allow_html=True)
+        st.caption('Contribution to the log-odds of Dropout; positive values push towards Dropout.')
+
     with col3:
         # Check if Nationality is within the valid range for international students
         if 2 <= Nationality <= 21:
             # Use model2 for International students
-            prediction = model2.predict(feature_values_scaled)
+            prediction, _ = scorer.predict_with_proba('model2', new_data.values[0])
             st.markdown("<h1 style='color: blue; font-size: 30px;'>International students result:</h1>", unsafe_allow_html=True)
 
-            if prediction[0] == 1:
+            if prediction == 1:
                 st.markdown(f"<h2 style='font-size: 30px; color: green;'>Dropout！</h2>", unsafe_allow_html=True)
-            elif prediction[0] == 0:
+            elif prediction == 0:
                 st.markdown(f"<h2 style='font-size: 30px; color: green;'>Graduate！</h2>", unsafe_allow_html=True)
 
             # Display features and values for International students
@@ -133,27 +149,15 @@ try:
         else:
             # Adjust the Nationality to 10 if it doesn't meet the criteria for international
             Nationality = 10
-            # Create the new data again with the modified Nationality
-            input_features = [[Marital, Mode, Order, Course, Attendance, Qualification, Nationality,
-                               Mother_Q, Father_Q, Mother_O, Father_O, Displaced, Need, Debtor,
-                               Fee, Gender, Scholarship, Age, First, Second, Unemployment, Inflation, GDP]]
-
-            # Create DataFrame
-            new_data = pd.DataFrame(input_features, columns=['Marital', 'Mode', 'Order', 'Course', 'Attendance', 'Qualification',
-                                                             'Nationality', 'Mother_Q', 'Father_Q', 'Mother_O', 'Father_O',
-                                                             'Displaced', 'Need', 'Debtor', 'Fee', 'Gender', 'Scholarship',
-                                                             'Age', 'First', 'Second', 'Unemployment', 'Inflation', 'GDP'])
-
-            # Standardize the input features
-            feature_values_scaled = scaler.transform(new_data.values)
-            
-            # Perform prediction for the modified Nationality (if needed)
-            prediction = model2.predict(feature_values_scaled)
+            new_data = new_data.assign(Nationality=Nationality)
+
+            # Perform prediction for the modified Nationality: one changed term of model2
+            prediction, _ = scorer.predict_with_proba('model2', new_data.values[0])
             st.markdown("<h1 style='color: blue; font-size: 30px;'>International students result:</h1>", unsafe_allow_html=True)
 
-            if prediction[0] == 1:
+            if prediction == 1:
                 st.markdown(f"<h2 style='font-size: 30px; color: green;'>Dropout！</h2>", unsafe_allow_html=True)
-            elif prediction[0] == 0:
+            elif prediction == 0:
                 st.markdown(f"<h2 style='font-size: 30px; color: green;'>Graduate！</h2>", unsafe_allow_html=True)
 
             # Display features and values for Domestic students
@@ -168,18 +172,11 @@ try:
 
             rows_df = pd.DataFrame(rows, columns=['Line 1', 'Line 2'])
             st.dataframe(rows_df, use_container_width=True)
-        col1, col2, col3, col4, col5 = st.columns([4, 4, 2, 2, 2])  
-
-        with col1:
-            st.markdown("<p style='font-size: 20px;'>1. 2nd semester approved course.</p>", unsafe_allow_html=True)
-        with col2:  
-            st.markdown("<p style='font-size: 20px;'>2. 1st semester approved course.</p>", unsafe_allow_html=True)
-        with col3:  
-            st.markdown("<p style='font-size: 20px;'>3. Tuition fee.</p>", unsafe_allow_html=True)
-        with col4:  
-            st.markdown("<p style='font-size: 20px;'>4. Course type.</p>", unsafe_allow_html=True)
-        with col5:  
-            st.markdown("<p style='font-size: 20px;'>5. Debtor.</p>", unsafe_allow_html=True)
+        # The five features that moved this student's prediction most
+        drivers = top_drivers(model2_attributions(new_data.values[0]))
+        for rank, (label, value) in enumerate(drivers, 1):
+            st.markdown(f"<p style='font-size: 20px;'>{rank}. {label} ({value:+.2f}).</p>", unsafe_allow_html=True)
+        st.caption('Contribution to the log-odds of Dropout; positive values push towards Dropout.')
 
 
 except ValueError as e:
@@ -1,15 +1,11 @@
 import streamlit as st
-import pickle
 import pandas as pd
 from sklearn.preprocessing import StandardScaler
+from model_registry import load_models
+from explanations import global_top_factors
 
-# Load models
-model1 = pickle.load(open('best_model_non5.pkl', 'rb'))
-model2 = pickle.load(open('best_model_int7.9.pkl', 'rb'))
-
-# Load Scaler object (only once)
-with open('scaler.pkl', 'rb') as f:
-    scaler = pickle.load(f)
+# Load models and Scaler object (once per server process, shared by all sessions)
+model1, model2, scaler = load_models()
 
 # Page configuration
 st.set_page_config(
@@ -139,18 +135,10 @@ try:
         # Impact factors ranking display
         st.markdown("<h2 style='color: darkblue;font-size: 24px;'>Impact factors ranking:</h2>", unsafe_allow_html=True)
 
-        col1, col2, col3, col4, col5 = st.columns([4, 4, 2, 2, 2])  
-
-        with col1:
-            st.markdown("<p style='font-size: 20px;'>1. 2nd semester approved course.</p>", unsafe_allow_html=True)
-        with col2:  
-            st.markdown("<p style='font-size: 20px;'>2. 1st semester approved course.</p>", unsafe_allow_html=True)
-        with col3:  
-            st.markdown("<p style='font-size: 20px;'>3. Tuition fee.</p>", unsafe_allow_html=True)
-        with col4:  
-            st.markdown("<p style='font-size: 20px;'>4. Course type.</p>", unsafe_allow_html=True)
-        with col5:  
-            st.markdown("<p style='font-size: 20px;'>5. Debtor.</p>", unsafe_allow_html=True)
+        # Globally most important features of the model used above
+        for rank, (col, label) in enumerate(zip(st.columns(5), global_top_factors('model2')), 1):
+            with col:
+                st.markdown(f"<p style='font-size: 20px;'>{rank}. {label}.</p>", unsafe_allow_html=True)
 
     elif 'feature_values_scaled_non' in locals():  # Check if the domestic feature set is present
         prediction = model1.predict(feature_values_scaled_non)
@@ -169,18 +157,10 @@ try:
         # Impact factors ranking display
         st.markdown("<h2 style='color: darkblue;font-size: 24px;'>Impact factors ranking:</h2>", unsafe_allow_html=True)
 
-        col1, col2, col3, col4, col5 = st.columns([4, 4, 2, 2, 2])  
-
-        with col1:
-            st.markdown("<p style='font-size: 20px;'>1. 2nd semester approved course.</p>", unsafe_allow_html=True)
-        with col2:  
-            st.markdown("<p style='font-size: 20px;'>2. 1st semester approved course.</p>", unsafe_allow_html=True)
-        with col3:  
-            st.markdown("<p style='font-size: 20px;'>3. Tuition fee.</p>", unsafe_allow_html=True)
-        with col4:  
-            st.markdown("<p style='font-size: 20px;'>4. Course type.</p>", unsafe_allow_html=True)
-        with col5:  
-            st.markdown("<p style='font-size: 20px;'>5. Scholarship.</p>", unsafe_allow_html=True)
+        # Globally most important features of the model used above
+        for rank, (col, label) in enumerate(zip(st.columns(5), global_top_factors('model1')), 1):
+            with col:
+                st.markdown(f"<p style='font-size: 20px;'>{rank}. {label}.</p>", unsafe_allow_html=True)
 
     else:
         st.warning("No valid feature set found for prediction.")
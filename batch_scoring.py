@@ -0,0 +1,221 @@
+"""Score whole cohorts of students from a CSV or Excel file.
+
+Rows are read in chunks, checked against the 23-feature layout, routed to
+the domestic or international model with the app's Nationality rule (one
+boolean mask per chunk, ``route``) and scored with one vectorized call per
+model and chunk; the results are written back into arrays in row order.  Most features are
+low-cardinality codes, so cohorts and scenario sets repeat whole feature
+vectors: each chunk is collapsed to its distinct rows first, those are
+scored and the results are broadcast back.  The number of distinct rows is
+kept in ``DataFrame.attrs['distinct_rows']``.
+
+With ``both_models`` every row is scored by both models side by side, as
+18.py shows a single student: model1 on the row as it is, model2 with a
+Nationality outside the international range replaced by 10 (a column
+assignment on the domestic partition only).
+
+With ``early_exit`` the domestic rows are only labelled, stopping each row
+once the remaining trees can no longer change its outcome
+(``FlatGBM.predict_early_exit``); the probability column is then left out
+and the number of trees evaluated per row is reported instead.
+
+Rows that cannot be scored (``invalid_rows``: an infinite value, or a
+missing one in a row model1 scores) do not fail the file.  They are kept
+with empty result columns and their index labels are listed in
+``DataFrame.attrs['invalid_rows']``.
+"""
+import numpy as np
+import pandas as pd
+
+from features import COLUMN_ALIASES, FALLBACK_NATIONALITY, FEATURE_COLUMNS, OUTCOMES, is_international
+
+# Rows parsed and scored per chunk
+CHUNK_ROWS = 5000
+
+NATIONALITY = FEATURE_COLUMNS.index('Nationality')
+
+
+def read_chunks(file, filename, chunk_rows=CHUNK_ROWS):
+    """Yield DataFrames of at most ``chunk_rows`` rows from a CSV/Excel file."""
+    if filename.lower().endswith('.csv'):
+        yield from pd.read_csv(file, chunksize=chunk_rows)
+    elif filename.lower().endswith(('.xlsx', '.xls')):
+        # pandas cannot stream Excel sheets, so only the scoring is chunked
+        frame = pd.read_excel(file)
+        for start in range(0, len(frame), chunk_rows):
+            yield frame.iloc[start:start + chunk_rows]
+    else:
+        raise ValueError(f'Unsupported file type: {filename}')
+
+
+def validate_columns(chunk):
+    """Return ``(chunk, X)``: the chunk with canonical column names and
+    numeric features, and the features as a float64 array.
+
+    Raises ValueError naming any missing or non-numeric feature column.
+    Columns that are not model inputs (e.g. a student ID) are kept.  The
+    chunk's data is shared, not copied; only converted columns are new.
+    """
+    chunk = chunk.copy(deep=False)
+    chunk.columns = [COLUMN_ALIASES.get(column, column) for column in chunk.columns]
+    missing = [c for c in FEATURE_COLUMNS if c not in chunk.columns]
+    if missing:
+        raise ValueError(f"Missing columns: {', '.join(missing)}")
+    X = np.empty((len(chunk), len(FEATURE_COLUMNS)))
+    for i, column in enumerate(FEATURE_COLUMNS):
+        if not pd.api.types.is_numeric_dtype(chunk[column]):
+            try:
+                chunk[column] = pd.to_numeric(chunk[column])
+            except (ValueError, TypeError):
+                raise ValueError(f'Column {column} must be numeric')
+        X[:, i] = chunk[column].to_numpy(dtype=np.float64, na_value=np.nan)
+    return chunk, X
+
+
+def unique_rows(X):
+    """``(distinct rows, inverse)`` with ``X == distinct[inverse]``."""
+    X = np.ascontiguousarray(X, dtype=np.float64)
+    # One byte string per row makes np.unique a flat sort
+    keys = X.view(np.dtype((np.void, X.dtype.itemsize * X.shape[1]))).ravel()
+    _, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+    return X[first], inverse.ravel()
+
+
+def dedup_ratio(scored):
+    """Scored rows per distinct feature vector of a scored frame."""
+    rows = len(scored) - len(scored.attrs.get('invalid_rows', ()))
+    return rows / max(scored.attrs.get('distinct_rows', rows), 1)
+
+
+def route(X):
+    """Boolean mask of the rows of ``X`` that model2 scores (2 <= Nationality <= 21)."""
+    return is_international(X[:, NATIONALITY])
+
+
+def invalid_rows(X, both_models=False):
+    """Boolean mask of the rows of ``X`` that cannot be scored.
+
+    model2 imputes missing values like its pipeline, model1 needs every
+    feature, and neither takes infinities.  A row without Nationality is
+    routed to model1.
+    """
+    uses_model1 = np.ones(len(X), dtype=bool) if both_models else ~route(X)
+    return np.isinf(X).any(axis=1) | (np.isnan(X).any(axis=1) & uses_model1)
+
+
+def score_features(X, scaler, gbm, lr):
+    """Predictions and dropout probabilities for raw feature rows.
+
+    ``gbm`` scores scaled domestic rows (FlatGBM), ``lr`` scores raw
+    international rows (FusedLogistic).  Returns ``(international,
+    prediction, probability)`` arrays aligned with ``X``.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    international = route(X)
+    prediction = np.empty(len(X), dtype=int)
+    probability = np.empty(len(X))
+    if international.any():
+        prediction[international], probability[international] = lr.predict_with_proba(X[international])
+    if not international.all():
+        domestic = ~international
+        prediction[domestic], probability[domestic] = gbm.predict_with_proba(scaler.transform(X[domestic]))
+    return international, prediction, probability
+
+
+def score_both_models(X, scaler, gbm, lr):
+    """Both models for every raw row, like 18.py's two result columns.
+
+    model1 scores the rows as they are.  model2 scores the international
+    partition as it is and the domestic partition with its Nationality
+    column set to ``FALLBACK_NATIONALITY``; ``X`` itself is not copied.
+    Returns ``(domestic prediction, domestic probability, international
+    prediction, international probability)`` aligned with ``X``.
+    """
+    X = np.asarray(X, dtype=np.float64)
+    domestic_prediction, domestic_probability = gbm.predict_with_proba(scaler.transform(X))
+    international = route(X)
+    international_prediction = np.empty(len(X), dtype=int)
+    international_probability = np.empty(len(X))
+    if international.any():
+        international_prediction[international], international_probability[international] = lr.predict_with_proba(X[international])
+    if not international.all():
+        domestic = ~international
+        fallback = X[domestic]
+        fallback[:, NATIONALITY] = FALLBACK_NATIONALITY
+        international_prediction[domestic], international_probability[domestic] = lr.predict_with_proba(fallback)
+    return domestic_prediction, domestic_probability, international_prediction, international_probability
+
+
+def screen_features(X, scaler, gbm, lr):
+    """Labels only, with early exit for the domestic rows.
+
+    Returns ``(international, prediction, trees)`` arrays aligned with
+    ``X``; ``trees`` is the number of model1 trees evaluated (0 for
+    international rows).
+    """
+    X = np.asarray(X, dtype=np.float64)
+    international = route(X)
+    prediction = np.empty(len(X), dtype=int)
+    trees = np.zeros(len(X), dtype=int)
+    if international.any():
+        prediction[international] = lr.predict(X[international])
+    if not international.all():
+        domestic = ~international
+        prediction[domestic], trees[domestic] = gbm.predict_early_exit(scaler.transform(X[domestic]))
+    return international, prediction, trees
+
+
+def score_chunk(chunk, scaler, gbm, lr, early_exit=False, both_models=False):
+    """Validate and score one chunk; returns it with result columns added."""
+    if early_exit and both_models:
+        raise ValueError('early_exit and both_models cannot be combined')
+    chunk, X = validate_columns(chunk)
+    invalid = invalid_rows(X, both_models)
+    distinct, inverse = unique_rows(X[~invalid] if invalid.any() else X)
+    # Results are Series on the valid rows; assigning them leaves NaN on the others
+    index = chunk.index[~invalid]
+
+    def column(values):
+        return pd.Series(values[inverse], index=index)
+
+    if both_models:
+        results = score_both_models(distinct, scaler, gbm, lr)
+        for model, (prediction, probability) in zip(('Domestic', 'International'), (results[:2], results[2:])):
+            chunk[f'{model} outcome'] = column(prediction).map(OUTCOMES)
+            chunk[f'{model} dropout probability'] = column(probability)
+    else:
+        if early_exit:
+            international, prediction, trees = screen_features(distinct, scaler, gbm, lr)
+        else:
+            international, prediction, probability = score_features(distinct, scaler, gbm, lr)
+        chunk['Student Type'] = column(np.where(international, 'International', 'Domestic'))
+        chunk['Outcome'] = column(prediction).map(OUTCOMES)
+        if early_exit:
+            chunk['Trees evaluated'] = column(trees)
+        else:
+            chunk['Dropout probability'] = column(probability)
+    chunk.attrs['distinct_rows'] = len(distinct)
+    chunk.attrs['invalid_rows'] = chunk.index[invalid].tolist()
+    return chunk
+
+
+def international_attributions(scored, lr):
+    """model2's per-feature log-odds contributions for the International
+    rows of a scored frame (NaN on Domestic rows), one column per feature.
+    """
+    attributions = np.full((len(scored), len(FEATURE_COLUMNS)), np.nan)
+    international = (scored['Student Type'] == 'International').to_numpy()
+    attributions[international] = lr.attributions(scored.loc[international, FEATURE_COLUMNS].to_numpy(dtype=np.float64))
+    return pd.DataFrame(attributions, columns=FEATURE_COLUMNS, index=scored.index)
+
+
+def score_file(file, filename, scaler, gbm, lr, chunk_rows=CHUNK_ROWS, early_exit=False, both_models=False):
+    """Score every row of an uploaded file; returns one DataFrame."""
+    scored = [score_chunk(chunk, scaler, gbm, lr, early_exit, both_models)
+              for chunk in read_chunks(file, filename, chunk_rows)]
+    if not scored:
+        raise ValueError('The file contains no rows')
+    result = pd.concat(scored, ignore_index=True)
+    result.attrs['distinct_rows'] = sum(chunk.attrs['distinct_rows'] for chunk in scored)
+    result.attrs['invalid_rows'] = [row for chunk in scored for row in chunk.attrs['invalid_rows']]
+    return result
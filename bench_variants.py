@@ -0,0 +1,272 @@
+"""Benchmark every app variant (1.py ... 18.py, 114.py) on the same inputs.
+
+    python bench_variants.py --inputs 20 --output bench_report.json
+    python bench_variants.py 114.py 18.py
+
+Each variant runs in its own subprocess under ``streamlit.testing``'s
+AppTest so peak RSS is measured per variant.  The child sets every slider
+from a fixed, seeded set of synthetic students, clicks 'Predict' and
+records the rerun latency, the time spent in model predict calls (model
+calls made by the what-if, risk-surface and counterfactual helpers are
+reported separately) and the peak RSS.  The parent collects the results into one JSON report.
+
+The child writes its result to a file named by the parent rather than to
+stdout: pycaret's import redirects fd 1 for a moment, and a variant may
+still be warming up a model in the background when it finishes.
+"""
+import argparse
+import atexit
+import collections
+import glob
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zlib
+
+import numpy as np
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+SEED = 2024
+
+# Helpers whose model calls are not part of the Predict path:
+# (file, function) found on the caller's stack -> name in the report
+AUXILIARY_CALLERS = {
+    ('what_if.py', 'sweep'): 'what_if',
+    ('what_if.py', 'risk_surface'): 'risk_surface',
+    ('counterfactual.py', 'counterfactual'): 'counterfactual',
+}
+
+
+def slider_position(student, label, occurrence, seed=SEED):
+    """Position in [0, 1) of a slider for synthetic student ``student``.
+
+    Derived from the label (and its occurrence, 'Application order' is used
+    twice) rather than the slider order, so every variant sees the same
+    students whatever its sidebar layout.
+    """
+    key = [seed, student, zlib.crc32(label.encode('utf-8')), occurrence]
+    return float(np.random.default_rng(key).random())
+
+
+def _summary(values_ms):
+    if not values_ms:
+        return None
+    values = np.array(values_ms)
+    return {
+        'mean': float(values.mean()),
+        'p50': float(np.percentile(values, 50)),
+        'p95': float(np.percentile(values, 95)),
+    }
+
+
+def _peak_rss_mb():
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        # Windows reports the peak directly; elsewhere fall back to getrusage
+        if hasattr(info, 'peak_wset'):
+            return info.peak_wset / 1e6
+    except ImportError:
+        pass
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1e6 if sys.platform == 'darwin' else peak / 1e3
+
+
+def _caller(frame):
+    while frame is not None:
+        name = AUXILIARY_CALLERS.get((os.path.basename(frame.f_code.co_filename), frame.f_code.co_name))
+        if name:
+            return name
+        frame = frame.f_back
+    return 'predict'
+
+
+def _time_predict_calls():
+    """Wrap the models' predict methods.
+
+    Only the outermost call is timed, so MicroBatcher.predict is not counted
+    again for the FlatGBM/FusedLogistic call it makes.  Returns a dict
+    mapping 'predict' or an ``AUXILIARY_CALLERS`` name to durations (ms).
+    """
+    calls = collections.defaultdict(list)
+    state = threading.local()
+
+    def wrap(cls, name):
+        original = getattr(cls, name)
+
+        def timed(self, *args, **kwargs):
+            # Nested calls, and the batcher thread scoring on behalf of a
+            # timed MicroBatcher.predict, belong to an outer call
+            if getattr(state, 'active', False) or threading.current_thread().name == 'micro-batcher':
+                return original(self, *args, **kwargs)
+            state.active = True
+            start = time.perf_counter()
+            try:
+                return original(self, *args, **kwargs)
+            finally:
+                state.active = False
+                calls[_caller(sys._getframe(1))].append(1000 * (time.perf_counter() - start))
+        setattr(cls, name, timed)
+
+    from sklearn.ensemble import GradientBoostingClassifier
+    from pycaret.internal.pipeline import Pipeline
+    from gbm_engine import FlatGBM
+    from lr_engine import FusedLogistic
+    from micro_batcher import MicroBatcher
+    wrap(GradientBoostingClassifier, 'predict')
+    wrap(Pipeline, 'predict')
+    wrap(FlatGBM, 'predict')
+    wrap(FlatGBM, 'predict_with_proba')
+    wrap(FlatGBM, 'predict_proba')
+    wrap(FusedLogistic, 'predict')
+    wrap(FusedLogistic, 'predict_with_proba')
+    wrap(FusedLogistic, 'predict_proba')
+    wrap(MicroBatcher, 'predict')
+    return calls
+
+
+def _set_sliders(at, student):
+    seen = collections.Counter()
+    for slider in at.slider:
+        position = slider_position(student, slider.label, seen[slider.label])
+        seen[slider.label] += 1
+        value = slider.min + position * (slider.max - slider.min)
+        if isinstance(slider.min, int):
+            slider.set_value(int(round(value)))
+        else:
+            slider.set_value(round(value, 2))
+
+
+def _enter_sandbox():
+    # Run in a scratch directory holding links to the images so variants
+    # that write files (12.py's predictions/) leave the checkout untouched
+    sandbox = tempfile.mkdtemp(prefix='bench_variants_')
+    for name in os.listdir(BASE_DIR):
+        if name.lower().endswith(('.jpg', '.jpeg', '.png')):
+            try:
+                os.symlink(os.path.join(BASE_DIR, name), os.path.join(sandbox, name))
+            except OSError:
+                shutil.copy(os.path.join(BASE_DIR, name), sandbox)
+    os.chdir(sandbox)
+    atexit.register(shutil.rmtree, sandbox, ignore_errors=True)
+
+
+def run_variant(path, students, timeout):
+    """Benchmark one script in this process; returns its result dict."""
+    from streamlit.testing.v1 import AppTest
+
+    with open(path, 'rb') as f:
+        try:
+            compile(f.read(), path, 'exec')
+        except SyntaxError as e:
+            return {'status': 'error', 'error': f'SyntaxError: {e}'}
+    _enter_sandbox()
+    predict_calls = _time_predict_calls()
+    result = {'status': 'ok'}
+    at = AppTest.from_file(path, default_timeout=timeout)
+    start = time.perf_counter()
+    at.run()
+    result['first_run_ms'] = 1000 * (time.perf_counter() - start)
+    if at.exception:
+        return {'status': 'error', 'error': at.exception[0].message, 'peak_rss_mb': _peak_rss_mb()}
+
+    rerun_ms = []
+    errors = 0
+    for student in range(students):
+        _set_sliders(at, student)
+        buttons = [b for b in at.button if b.label == 'Predict']
+        for button in buttons:
+            button.click()
+        start = time.perf_counter()
+        try:
+            at.run()
+        except Exception as e:
+            return {'status': 'error', 'error': f'{type(e).__name__}: {e}', 'peak_rss_mb': _peak_rss_mb()}
+        rerun_ms.append(1000 * (time.perf_counter() - start))
+        errors += len(at.exception) + len(at.error)
+
+    auxiliary = {caller: {'calls': len(durations), 'ms': _summary(durations)}
+                 for caller, durations in sorted(predict_calls.items()) if caller != 'predict'}
+    result.update({
+        'reruns': len(rerun_ms),
+        'rerun_ms': _summary(rerun_ms),
+        'predict_calls': len(predict_calls['predict']),
+        'predict_ms': _summary(predict_calls['predict']),
+        'auxiliary_calls': auxiliary,
+        'app_errors': errors,
+        'status': 'ok' if not errors else 'app_error',
+        'peak_rss_mb': _peak_rss_mb(),
+    })
+    return result
+
+
+def variant_paths(names=None):
+    if names:
+        return [os.path.join(BASE_DIR, name) for name in names]
+    paths = glob.glob(os.path.join(BASE_DIR, '[0-9]*.py'))
+    return sorted(paths, key=lambda p: int(os.path.basename(p)[:-3]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the Streamlit app variants.')
+    parser.add_argument('variants', nargs='*', help='scripts to run (default: every numbered script)')
+    parser.add_argument('--inputs', type=int, default=20, help='synthetic students per variant')
+    parser.add_argument('--timeout', type=float, default=120, help='seconds allowed per rerun')
+    parser.add_argument('--output', default='bench_report.json', help='JSON report path')
+    parser.add_argument('--child', help=argparse.SUPPRESS)
+    parser.add_argument('--result', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child:
+        # Child mode: benchmark a single variant and write its result
+        result = run_variant(args.child, args.inputs, args.timeout)
+        with open(args.result, 'w', encoding='utf-8') as f:
+            json.dump(result, f)
+        return 0
+
+    report = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'inputs': args.inputs,
+        'seed': SEED,
+        'variants': {},
+    }
+    for path in variant_paths(args.variants):
+        name = os.path.basename(path)
+        fd, result_path = tempfile.mkstemp(prefix='bench_result_', suffix='.json')
+        os.close(fd)
+        try:
+            proc = subprocess.run([sys.executable, os.path.abspath(__file__), '--child', path,
+                                   '--result', result_path, '--inputs', str(args.inputs),
+                                   '--timeout', str(args.timeout)],
+                                  capture_output=True, text=True, cwd=BASE_DIR)
+            with open(result_path, encoding='utf-8') as f:
+                text = f.read()
+        finally:
+            os.remove(result_path)
+        if proc.returncode == 0 and text:
+            result = json.loads(text)
+        else:
+            result = {'status': 'error', 'error': proc.stderr.strip()[-500:]}
+        report['variants'][name] = result
+        rerun = result.get('rerun_ms') or {}
+        print(f"{name:<8} {result['status']:<9} rerun p50 {rerun.get('p50', float('nan')):8.1f} ms"
+              f"  peak RSS {result.get('peak_rss_mb', float('nan')):7.1f} MB")
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f'Report written to {args.output}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
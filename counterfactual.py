@@ -0,0 +1,124 @@
+"""Counterfactual search: the smallest actionable change that turns a
+predicted Dropout into Graduate.
+
+Only features an advisor can act on are changed (``ACTIONABLE``), within
+their slider ranges.  Candidates are searched by the number of changed
+features: every combination with one changed feature is scored in a single
+batched call, then two, then three.  The first level that contains a
+Graduate answers the question; within it the change with the smallest
+total distance (as a share of each slider's range) wins.
+
+The candidate values are pruned per model before anything is scored:
+
+* model1 (GBM): a value is only worth trying if a split threshold of the
+  feature lies between it and the current value, and of the values between
+  the same two thresholds only the closest one is kept; the others reach
+  exactly the same leaves.
+* model2 (logistic): the log-odds are monotone in each feature, so only
+  values that move them towards Graduate are kept.
+"""
+import itertools
+import time
+
+import numpy as np
+
+from features import FEATURE_COLUMNS, SLIDER_RANGES
+from gbm_engine import flat_model1, model1_thresholds
+from lr_engine import fused_model2
+from model_registry import registry
+from what_if import feature_values
+
+# Features an advisor can act on
+ACTIONABLE = ['First', 'Second', 'Fee', 'Scholarship', 'Debtor', 'Attendance']
+
+# Most features changed at once
+MAX_CHANGES = 3
+
+# Seconds after which no further level is started
+TIME_BUDGET = 1.0
+
+
+def _distance(column, old, new):
+    low, high = SLIDER_RANGES[column]
+    return abs(new - old) / (high - low)
+
+
+def _gbm_candidates(x, column):
+    # One value per interval between split thresholds, the closest to x
+    i = FEATURE_COLUMNS.index(column)
+    scaler = registry.get('scaler')
+    values = feature_values(column)
+    # Same float64 -> float32 path as scaler.transform followed by the trees
+    scaled = ((values - scaler.mean_[i]) / scaler.scale_[i]).astype(np.float32).astype(np.float64)
+    current = np.float64(np.float32((x[i] - scaler.mean_[i]) / scaler.scale_[i]))
+    thresholds = model1_thresholds()[i]
+    intervals = np.searchsorted(thresholds, scaled, side='left')
+    current_interval = np.searchsorted(thresholds, current, side='left')
+    best = {}
+    for value, interval in zip(values, intervals):
+        if interval == current_interval:
+            continue
+        if interval not in best or abs(value - x[i]) < abs(best[interval] - x[i]):
+            best[interval] = value
+    return sorted(best.values(), key=lambda value: abs(value - x[i]))
+
+
+def _lr_candidates(x, column):
+    # Only values that lower the log-odds of Dropout
+    i = FEATURE_COLUMNS.index(column)
+    weight = fused_model2().weights[i]
+    return [value for value in feature_values(column) if weight * (value - x[i]) < 0]
+
+
+def _predict(model_id, X):
+    if model_id == 'model2':
+        return fused_model2().predict_with_proba(X)
+    return flat_model1().predict_with_proba(registry.get('scaler').transform(X))
+
+
+def _search(x, model_id, actionable, max_changes, time_budget):
+    candidates_of = _lr_candidates if model_id == 'model2' else _gbm_candidates
+    candidates = {column: candidates_of(x, column) for column in actionable}
+    candidates = {column: values for column, values in candidates.items() if values}
+    started = time.perf_counter()
+    rows_scored = 0
+    for n_changes in range(1, max_changes + 1):
+        if time.perf_counter() - started > time_budget:
+            break
+        changes = []
+        for columns in itertools.combinations(candidates, n_changes):
+            for values in itertools.product(*(candidates[column] for column in columns)):
+                changes.append(list(zip(columns, values)))
+        if not changes:
+            break
+        X = np.tile(x, (len(changes), 1))
+        for row, change in enumerate(changes):
+            for column, value in change:
+                X[row, FEATURE_COLUMNS.index(column)] = value
+        labels, probabilities = _predict(model_id, X)
+        rows_scored += len(X)
+        flipped = np.flatnonzero(labels == 0)
+        if len(flipped):
+            costs = [sum(_distance(column, x[FEATURE_COLUMNS.index(column)], value) for column, value in changes[row])
+                     for row in flipped]
+            row = flipped[int(np.argmin(costs))]
+            return {
+                'changes': [(column, x[FEATURE_COLUMNS.index(column)], value) for column, value in changes[row]],
+                'probability': float(probabilities[row]),
+                'rows_scored': rows_scored,
+            }
+    return {'changes': None, 'probability': None, 'rows_scored': rows_scored}
+
+
+def counterfactual(x, model_id, actionable=ACTIONABLE, max_changes=MAX_CHANGES, time_budget=TIME_BUDGET):
+    """Smallest change of ``actionable`` features that predicts Graduate.
+
+    Returns a dict with ``changes`` (a list of ``(column, old, new)``; empty
+    if ``x`` is already predicted Graduate, None if nothing was found),
+    the new Dropout ``probability`` and the number of ``rows_scored``.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    labels, probabilities = _predict(model_id, x.reshape(1, -1))
+    if labels[0] == 0:
+        return {'changes': [], 'probability': float(probabilities[0]), 'rows_scored': 1}
+    return _search(x, model_id, list(actionable), max_changes, time_budget)
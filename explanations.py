@@ -0,0 +1,67 @@
+"""Per-student 'Impact factors ranking' for the app.
+
+The ranking used to be five hard-coded lines, identical for every
+student.  It now lists the features that moved this student's prediction
+most: exact TreeSHAP values of model1 (gbm_shap.py) or the closed-form
+contributions of model2's logistic regression (lr_engine.py), both in
+log-odds of Dropout.  Attributions are cached per feature vector like
+predictions.
+
+Scripts without per-student attributions rank features by the deployed
+model's global importance, derived once per loaded artifact.
+"""
+import numpy as np
+
+from features import FEATURE_COLUMNS, FEATURE_LABELS
+from gbm_shap import shap_model1
+from lr_engine import fused_model2
+from model_registry import registry
+from prediction_cache import PredictionCache, artifact_signature
+
+# Features listed in the ranking
+TOP_K = 5
+
+attribution_cache = PredictionCache(maxsize=1024, signature=artifact_signature)
+
+
+def model1_attributions(x):
+    """TreeSHAP values of model1 for one raw (unscaled) feature row."""
+    x = np.asarray(x, dtype=np.float64).reshape(1, -1)
+    return attribution_cache.get_or_compute(
+        'model1', x[0], lambda: shap_model1().shap_values(registry.get('scaler').transform(x))[0])
+
+
+def model2_attributions(x):
+    """Logistic contributions of model2 for one raw feature row."""
+    x = np.asarray(x, dtype=np.float64).reshape(1, -1)
+    return attribution_cache.get_or_compute('model2', x[0], lambda: fused_model2().attributions(x)[0])
+
+
+def top_drivers(attributions, k=TOP_K):
+    """``[(label, attribution)]`` of the ``k`` largest absolute attributions."""
+    order = np.argsort(-np.abs(attributions), kind='stable')[:k]
+    return [(FEATURE_LABELS[FEATURE_COLUMNS[i]], float(attributions[i])) for i in order]
+
+
+def _shares(values):
+    values = np.abs(np.asarray(values, dtype=np.float64))
+    return values / values.sum()
+
+
+def global_importance(model_id):
+    """Share of the model's overall importance per feature (sums to 1).
+
+    model1: the GBM's impurity-based ``feature_importances_``; model2:
+    ``|coef_|`` of the logistic regression, whose inputs are standardized
+    so the coefficients are comparable.
+    """
+    if model_id == 'model1':
+        return registry.derived('model1', 'global_importance', lambda model: _shares(model.feature_importances_))
+    if model_id == 'model2':
+        return registry.derived('model2', 'global_importance', lambda pipeline: _shares(pipeline.steps[-1][1].coef_[0]))
+    raise ValueError(f'Unknown model id: {model_id}')
+
+
+def global_top_factors(model_id, k=TOP_K):
+    """Labels of the ``k`` globally most important features of a model."""
+    return [label for label, _ in top_drivers(global_importance(model_id), k)]
@@ -0,0 +1,94 @@
+"""Input layout shared by the app scripts and the batch scorers."""
+
+# The 23 model inputs, in the order the scaler and both models expect
+FEATURE_COLUMNS = ['Marital', 'Mode', 'Order', 'Course', 'Attendance', 'Qualification',
+                   'Nationality', 'Mother_Q', 'Father_Q', 'Mother_O', 'Father_O',
+                   'Displaced', 'Need', 'Debtor', 'Fee', 'Gender', 'Scholarship',
+                   'Age', 'First', 'Second', 'Unemployment', 'Inflation', 'GDP']
+
+# Labels of the sidebar sliders, used when the app names a feature
+FEATURE_LABELS = {
+    'Marital': 'Marital status',
+    'Mode': 'Application mode',
+    'Order': 'Application order',
+    'Course': 'Course type',
+    'Attendance': 'Daytime/evening attendance',
+    'Qualification': 'Previous qualification',
+    'Nationality': 'Nationality',
+    'Mother_Q': 'Mother qualification',
+    'Father_Q': 'Father qualification',
+    'Mother_O': 'Mother occupation',
+    'Father_O': 'Father occupation',
+    'Displaced': 'Displaced',
+    'Need': 'Educational special need',
+    'Debtor': 'Debtor',
+    'Fee': 'Tuition fee',
+    'Gender': 'Gender',
+    'Scholarship': 'Scholarship',
+    'Age': 'Age',
+    'First': '1st semester approved course',
+    'Second': '2nd semester approved course',
+    'Unemployment': 'Unemployment rate',
+    'Inflation': 'Inflation rate',
+    'GDP': 'GDP',
+}
+
+# (min, max) of each sidebar slider, as in 114.py
+SLIDER_RANGES = {
+    'Marital': (1, 4),
+    'Mode': (1, 18),
+    'Order': (1, 5),
+    'Course': (1, 17),
+    'Attendance': (0, 1),
+    'Qualification': (1, 14),
+    'Nationality': (1, 21),
+    'Mother_Q': (1, 28),
+    'Father_Q': (1, 28),
+    'Mother_O': (1, 25),
+    'Father_O': (1, 26),
+    'Displaced': (0, 1),
+    'Need': (0, 1),
+    'Debtor': (0, 1),
+    'Fee': (0, 1),
+    'Gender': (0, 1),
+    'Scholarship': (0, 1),
+    'Age': (18, 59),
+    'First': (0, 18),
+    'Second': (0, 12),
+    'Unemployment': (7.6, 16.2),
+    'Inflation': (-0.8, 3.7),
+    'GDP': (-4.06, 3.51),
+}
+
+# Inputs taken from float sliders; every other input is an integer code
+CONTINUOUS_COLUMNS = ['Unemployment', 'Inflation', 'GDP']
+
+# Column names used in the original training data (and by scaler.pkl)
+COLUMN_ALIASES = {
+    'Mother-Q': 'Mother_Q',
+    'Father-Q': 'Father_Q',
+    'Mother-O': 'Mother_O',
+    'Father-O': 'Father_O',
+    '1st': 'First',
+    '2nd': 'Second',
+    'second': 'Second',
+}
+
+# Nationality codes scored with the international model (as in 114.py/18.py)
+INTERNATIONAL_NATIONALITY = (2, 21)
+
+# Nationality 18.py scores with the international model when the slider is
+# outside INTERNATIONAL_NATIONALITY
+FALLBACK_NATIONALITY = 10
+
+# Model prediction -> outcome label shown in the app
+OUTCOMES = {1: 'Dropout', 0: 'Graduate'}
+
+
+def is_international(nationality):
+    """Routing rule of the app: ``2 <= Nationality <= 21`` uses model2.
+
+    Works on scalars and on NumPy arrays / pandas Series.
+    """
+    low, high = INTERNATIONAL_NATIONALITY
+    return (low <= nationality) & (nationality <= high)
@@ -0,0 +1,371 @@
+"""Flat-array inference engine for the domestic GradientBoosting model.
+
+``FlatGBM`` copies every tree of a fitted binary
+``GradientBoostingClassifier`` into a handful of contiguous NumPy arrays
+once (split feature, threshold, children, leaf value) and evaluates all
+trees of a batch together: each traversal step moves every (row, tree)
+pair one level down.
+
+Leaf values are pre-multiplied by the learning rate and accumulated in
+stage order, starting from the model's prior, exactly as sklearn does, so
+decision values are bit-identical to ``model.decision_function``.
+
+Most of sklearn's cost for a single row is input validation, not the
+trees.  For larger batches its compiled ``predict_stages`` loop is faster
+than a NumPy traversal on one core, so batches above ``FLAT_MAX_ROWS``
+call it directly on the already validated input.  It is private to
+sklearn; should a release move it, the same sums are taken from each
+tree's public ``predict``.
+
+``split_thresholds`` collects every feature's split thresholds over all
+trees: two values with no threshold between them reach the same leaf in
+every tree.  The counterfactual search uses it to prune candidate values.
+Cohorts repeat whole feature vectors, so batch callers score only the
+distinct rows (``batch_scoring.unique_rows``).
+
+``BinnedGBM`` scores large cohorts on uint8 bin codes instead.  At load
+time every split threshold becomes the index of the threshold in its
+feature's sorted ``split_thresholds``, and every tree is padded to a
+complete tree of the maximum depth (a shallower leaf becomes a chain of
+splits that always go left).  At scoring time each input is looked up in
+the same tables: its code is the number of thresholds below it, and
+``x <= threshold[k]`` exactly when the code is at most ``k``.  A block of
+rows is then a few kilobytes of codes, each tree 2 bytes per split, and
+the traversal is a fixed number of branch-free steps.  The loop is
+compiled with numba (a pycaret dependency); without it ``BinnedGBM``
+scores like ``FlatGBM``.
+
+``predict_early_exit`` is an opt-in label-only mode for screening large
+cohorts.  Trees are added in stage order, ``EARLY_EXIT_BLOCK`` at a time,
+and a row stops as soon as the smallest and largest total the remaining
+trees could still add (from their leaf values) cannot move its log-odds
+across 0; its label is the side that bound puts it on.  A margin covering
+the floating-point error of the remaining additions makes the labels
+identical to ``predict``.
+"""
+import numpy as np
+from scipy.special import expit
+
+from model_registry import registry
+
+try:
+    import numba
+except ImportError:
+    numba = None
+
+# Rows evaluated per traversal block; bounds the (rows x trees) work arrays
+BLOCK_ROWS = 4096
+
+# Largest batch scored with the NumPy traversal instead of predict_stages
+FLAT_MAX_ROWS = 4
+
+# Trees added between two early-exit checks
+EARLY_EXIT_BLOCK = 10
+
+# Rows per block of codes in the compiled BinnedGBM traversal
+CODE_BLOCK_ROWS = 1024
+
+
+def predict_stages_fallback(estimators, X, scale, out):
+    """``predict_stages`` through each tree's public ``predict``.
+
+    Adds ``scale * leaf value`` stage by stage like the compiled loop, so
+    the sums are bit-identical, only slower.
+    """
+    for stage in estimators:
+        for k, tree in enumerate(stage):
+            out[:, k] += scale * tree.predict(X, check_input=False)
+
+
+try:
+    from sklearn.ensemble._gradient_boosting import predict_stages
+except ImportError:
+    predict_stages = predict_stages_fallback
+
+
+class FlatGBM:
+    """All trees of a binary GradientBoostingClassifier as flat arrays."""
+
+    def __init__(self, feature, threshold, left, right, value, roots, depth,
+                 init_raw, classes, n_features, estimators, learning_rate):
+        self.feature = feature        # split feature per node (0 for leaves)
+        self.threshold = threshold    # split threshold per node
+        self.left = left              # left child per node (self for leaves)
+        self.right = right            # right child per node (self for leaves)
+        self.value = value            # learning_rate * leaf value per node
+        self.roots = roots            # root node of each tree
+        self.depth = depth            # maximum depth over all trees
+        self.init_raw = init_raw      # log-odds of the prior
+        self.classes_ = classes
+        self.n_features = n_features
+        self.estimators = estimators  # kept for predict_stages
+        self.learning_rate = learning_rate
+
+    @classmethod
+    def from_estimator(cls, model):
+        if model.n_trees_per_iteration_ != 1:
+            raise ValueError('FlatGBM only supports binary classifiers')
+        if model.init_ != 'zero' and type(model.init_).__name__ != 'DummyClassifier':
+            raise ValueError('FlatGBM needs a constant init estimator')
+
+        trees = [est[0].tree_ for est in model.estimators_]
+        counts = np.array([t.node_count for t in trees])
+        roots = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        feature, threshold, left, right, value = [], [], [], [], []
+        for tree, root in zip(trees, roots):
+            nodes = np.arange(tree.node_count)
+            is_leaf = tree.children_left == -1
+            feature.append(np.where(is_leaf, 0, tree.feature))
+            threshold.append(tree.threshold)
+            left.append(np.where(is_leaf, nodes, tree.children_left) + root)
+            right.append(np.where(is_leaf, nodes, tree.children_right) + root)
+            value.append(model.learning_rate * tree.value[:, 0, 0])
+
+        # The prior does not depend on X, so evaluate it once on any row
+        n_features = model.n_features_in_
+        init_raw = float(model._raw_predict_init(np.zeros((1, n_features), dtype=np.float32))[0, 0])
+
+        return cls(
+            feature=np.ascontiguousarray(np.concatenate(feature), dtype=np.intp),
+            threshold=np.ascontiguousarray(np.concatenate(threshold), dtype=np.float64),
+            left=np.ascontiguousarray(np.concatenate(left), dtype=np.intp),
+            right=np.ascontiguousarray(np.concatenate(right), dtype=np.intp),
+            value=np.ascontiguousarray(np.concatenate(value), dtype=np.float64),
+            roots=roots.astype(np.intp),
+            depth=max(t.max_depth for t in trees),
+            init_raw=init_raw,
+            classes=model.classes_,
+            n_features=n_features,
+            estimators=model.estimators_,
+            learning_rate=model.learning_rate,
+        )
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    def _check_input(self, X):
+        # sklearn evaluates trees on float32 inputs; compare the same values
+        X = np.ascontiguousarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        if X.shape[1] != self.n_features:
+            raise ValueError(f'X has {X.shape[1]} features, but the model expects {self.n_features}')
+        if not np.isfinite(X).all():
+            raise ValueError('Input contains NaN or infinity.')
+        return X
+
+    def _apply_block(self, X):
+        # Leaf node reached by every (row, tree) pair of one block of rows
+        offsets = (np.arange(X.shape[0]) * self.n_features)[:, None]
+        flat_x = X.ravel()
+        nodes = np.broadcast_to(self.roots, (X.shape[0], self.n_trees)).copy()
+        for _ in range(self.depth):
+            x = flat_x[offsets + self.feature[nodes]]
+            nodes = np.where(x <= self.threshold[nodes], self.left[nodes], self.right[nodes])
+        return nodes
+
+    def _decision_block(self, X):
+        # Accumulate prior + tree outputs left to right, like predict_stages
+        leaves = self._apply_block(X)
+        stages = np.empty((X.shape[0], self.n_trees + 1))
+        stages[:, 0] = self.init_raw
+        stages[:, 1:] = self.value[leaves]
+        return np.add.accumulate(stages, axis=1)[:, -1]
+
+    def apply(self, X):
+        """Global leaf index per row and tree, shape (n_rows, n_trees)."""
+        X = self._check_input(X)
+        blocks = [self._apply_block(X[i:i + BLOCK_ROWS]) for i in range(0, X.shape[0], BLOCK_ROWS)]
+        return np.concatenate(blocks) if blocks else np.empty((0, self.n_trees), dtype=np.intp)
+
+    def decision_function(self, X):
+        X = self._check_input(X)
+        if X.shape[0] > FLAT_MAX_ROWS:
+            out = np.full((X.shape[0], 1), self.init_raw)
+            predict_stages(self.estimators, X, self.learning_rate, out)
+            return out[:, 0]
+        return self._decision_block(X)
+
+    def predict_proba(self, X):
+        proba = expit(self.decision_function(X))
+        return np.column_stack([1 - proba, proba])
+
+    def predict(self, X):
+        return self.classes_[(self.decision_function(X) >= 0).astype(int)]
+
+    def predict_with_proba(self, X):
+        """``(predict(X), predict_proba(X)[:, 1])`` from a single pass."""
+        raw = self.decision_function(X)
+        return self.classes_[(raw >= 0).astype(int)], expit(raw)
+
+    def _exit_bounds(self):
+        # Smallest/largest sum of the trees from stage k on, and the margin
+        if not hasattr(self, '_bounds'):
+            is_leaf = self.left == np.arange(len(self.left))
+            tree_of = np.searchsorted(self.roots, np.arange(len(self.left)), side='right') - 1
+            low = np.full(self.n_trees, np.inf)
+            high = np.full(self.n_trees, -np.inf)
+            np.minimum.at(low, tree_of[is_leaf], self.value[is_leaf])
+            np.maximum.at(high, tree_of[is_leaf], self.value[is_leaf])
+            remaining_low = np.append(np.cumsum(low[::-1])[::-1], 0.0)
+            remaining_high = np.append(np.cumsum(high[::-1])[::-1], 0.0)
+            # Every running sum is at most |prior| + sum of max |leaf|; each
+            # of the n_trees additions rounds by at most eps of it
+            largest = abs(self.init_raw) + np.maximum(np.abs(low), np.abs(high)).sum()
+            margin = self.n_trees * np.finfo(np.float64).eps * largest
+            self._bounds = remaining_low, remaining_high, margin
+        return self._bounds
+
+    def predict_early_exit(self, X, block=EARLY_EXIT_BLOCK):
+        """``(predict(X), trees evaluated per row)`` stopping each row early.
+
+        Labels are identical to ``predict``; no probability is computed.
+        """
+        X = self._check_input(X)
+        remaining_low, remaining_high, margin = self._exit_bounds()
+        raw = np.full((X.shape[0], 1), self.init_raw)
+        trees = np.zeros(X.shape[0], dtype=np.intp)
+        positive = np.zeros(X.shape[0], dtype=bool)
+        active = np.arange(X.shape[0])
+        for start in range(0, self.n_trees, block):
+            stop = min(start + block, self.n_trees)
+            out = raw[active]
+            predict_stages(self.estimators[start:stop], np.ascontiguousarray(X[active]), self.learning_rate, out)
+            raw[active] = out
+            trees[active] = stop
+            partial = out[:, 0]
+            above = partial + remaining_low[stop] - margin >= 0
+            decided = above | (partial + remaining_high[stop] + margin < 0)
+            # The partial sum may still be on the other side of 0; the
+            # bound that decided the row gives its label
+            positive[active[decided]] = above[decided]
+            active = active[~decided]
+            if not len(active):
+                break
+        # Rows within the margin after the last tree take the sign of the full sum
+        positive[active] = raw[active, 0] >= 0
+        return self.classes_[positive.astype(int)], trees
+
+
+def split_thresholds(model):
+    """Sorted unique split thresholds of every feature over all trees.
+
+    A tree sends ``x`` left when ``x <= threshold``, so two values with no
+    threshold between them reach the same leaf in every tree.
+    """
+    thresholds = [[] for _ in range(model.n_features_in_)]
+    for estimator in model.estimators_:
+        tree = estimator[0].tree_
+        split = tree.children_left != -1
+        for f, t in zip(tree.feature[split], tree.threshold[split]):
+            thresholds[f].append(t)
+    return [np.unique(np.asarray(t, dtype=np.float64)) for t in thresholds]
+
+
+def _score_codes(codes, split_feature, split_code, leaf_value, init_raw, block_rows, out):
+    # Complete trees: the children of split n are 2n+1 (left) and 2n+2.
+    # Each step moves every row of a block one level down; the rows are
+    # independent, so the CPU overlaps their loads
+    n_trees, n_splits = split_feature.shape
+    depth = 0
+    while (1 << depth) - 1 < n_splits:
+        depth += 1
+    n_features = codes.shape[1]
+    block = np.empty((n_features, block_rows), dtype=np.uint8)
+    nodes = np.empty(block_rows, dtype=np.int32)
+    for start in range(0, codes.shape[0], block_rows):
+        rows = min(block_rows, codes.shape[0] - start)
+        # Feature-major copy of the block: one feature's codes are adjacent
+        for i in range(rows):
+            for f in range(n_features):
+                block[f, i] = codes[start + i, f]
+        total = np.full(rows, init_raw)
+        for t in range(n_trees):
+            features = split_feature[t]
+            thresholds = split_code[t]
+            # Every row starts at the root
+            feature, threshold = features[0], thresholds[0]
+            for i in range(rows):
+                nodes[i] = 1 + (block[feature, i] > threshold)
+            for _ in range(depth - 1):
+                for i in range(rows):
+                    n = nodes[i]
+                    nodes[i] = 2 * n + 1 + (block[features[n], i] > thresholds[n])
+            # Stage order, like predict_stages: bit-identical sums
+            values = leaf_value[t]
+            for i in range(rows):
+                total[i] += values[nodes[i] - n_splits]
+        out[start:start + rows] = total
+
+
+if numba is not None:
+    _score_codes = numba.njit(nogil=True, cache=True)(_score_codes)
+
+
+class BinnedGBM(FlatGBM):
+    """FlatGBM that scores large batches on uint8 bin codes."""
+
+    @classmethod
+    def from_estimator(cls, model):
+        binned = super().from_estimator(model)
+        binned.thresholds = split_thresholds(model)
+        if max(len(t) for t in binned.thresholds) > 255:
+            raise ValueError('BinnedGBM needs at most 255 split thresholds per feature')
+        n_splits = 2 ** binned.depth - 1
+        # Padding splits compare with code 255, so they always go left
+        split_feature = np.zeros((binned.n_trees, n_splits), dtype=np.uint8)
+        split_code = np.full((binned.n_trees, n_splits), 255, dtype=np.uint8)
+        leaf_value = np.zeros((binned.n_trees, n_splits + 1))
+        for t, root in enumerate(binned.roots):
+            stack = [(root, 0, 0)]  # node, position in the complete tree, depth
+            while stack:
+                node, position, depth = stack.pop()
+                if binned.left[node] == node:
+                    # Reached by always going left from here to the last level
+                    last = (position + 1) * 2 ** (binned.depth - depth) - 1
+                    leaf_value[t, last - n_splits] = binned.value[node]
+                    continue
+                feature = binned.feature[node]
+                split_feature[t, position] = feature
+                split_code[t, position] = np.searchsorted(binned.thresholds[feature], binned.threshold[node])
+                stack.append((binned.left[node], 2 * position + 1, depth + 1))
+                stack.append((binned.right[node], 2 * position + 2, depth + 1))
+        binned.split_feature = split_feature  # feature per split, complete layout
+        binned.split_code = split_code        # threshold index per split
+        binned.leaf_value = leaf_value        # learning_rate * leaf value per leaf
+        return binned
+
+    def bin(self, X):
+        """uint8 bin codes of (scaled) rows, shape (n_rows, n_features)."""
+        X = self._check_input(X)
+        codes = np.empty(X.shape, dtype=np.uint8)
+        for f, thresholds in enumerate(self.thresholds):
+            # Trees compare the float32 value with float64 thresholds
+            codes[:, f] = np.searchsorted(thresholds, X[:, f].astype(np.float64), side='left')
+        return codes
+
+    def decision_function(self, X):
+        X = self._check_input(X)
+        if numba is None or X.shape[0] <= FLAT_MAX_ROWS:
+            return super().decision_function(X)
+        out = np.empty(X.shape[0])
+        _score_codes(self.bin(X), self.split_feature, self.split_code, self.leaf_value,
+                     self.init_raw, CODE_BLOCK_ROWS, out)
+        return out
+
+
+def model1_thresholds():
+    """``split_thresholds`` of the registry's model1, once per loaded artifact."""
+    return registry.derived('model1', 'split_thresholds', split_thresholds)
+
+
+def flat_model1():
+    """FlatGBM for the registry's model1, built once per loaded artifact."""
+    return registry.derived('model1', 'flat_gbm', FlatGBM.from_estimator)
+
+
+def binned_model1():
+    """BinnedGBM for the registry's model1, built once per loaded artifact."""
+    return registry.derived('model1', 'binned_gbm', BinnedGBM.from_estimator)
+
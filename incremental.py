@@ -0,0 +1,105 @@
+"""Incremental rescoring of one student between Streamlit reruns.
+
+Between two reruns usually only one of the 23 sliders has moved, yet a
+full prediction rebuilds the row, rescales all of it and evaluates every
+tree.  ``IncrementalScorer`` keeps the previous raw row per model and
+redoes only what the changed inputs affect:
+
+* model1 (GBM): the changed inputs are rescaled on their own and only the
+  trees that split on one of them are traversed again; every other tree
+  keeps its leaf.  The leaf values are summed in stage order like
+  ``FlatGBM``, so the log-odds are bit-identical to a full recompute.
+* model2 (logistic): the per-feature terms ``weights * x`` are kept and
+  only the changed terms are recomputed.  Their sum can differ from the
+  full dot product in the last bits.
+
+Keep one scorer per session (e.g. in ``st.session_state``); it is not
+thread-safe.
+"""
+import numpy as np
+from scipy.special import expit
+
+from gbm_engine import flat_model1
+from lr_engine import fused_model2
+from model_registry import registry
+
+
+def trees_by_feature(model):
+    """Indices of the trees that split on each feature."""
+    trees = [[] for _ in range(model.n_features_in_)]
+    for index, estimator in enumerate(model.estimators_):
+        tree = estimator[0].tree_
+        for f in np.unique(tree.feature[tree.children_left != -1]):
+            trees[f].append(index)
+    return [np.asarray(t, dtype=np.intp) for t in trees]
+
+
+class IncrementalScorer:
+    """Per-session model1/model2 scorer that only updates what changed."""
+
+    def __init__(self):
+        self._state = {}  # model id -> previous row and partial results
+        self.full = 0
+        self.incremental = 0
+        self.trees_evaluated = 0
+
+    def predict_with_proba(self, model_id, x):
+        """``(prediction, dropout probability)`` of one raw feature row."""
+        # A copy: the state must not change with the caller's array
+        x = np.array(x, dtype=np.float64).ravel()
+        if model_id == 'model1':
+            raw, classes = self._gbm(x), flat_model1().classes_
+        elif model_id == 'model2':
+            raw, classes = self._lr(x), fused_model2().classes_
+        else:
+            raise ValueError(f'Unknown model id: {model_id}')
+        return classes[int(raw >= 0)], float(expit(raw))
+
+    def _previous(self, model_id, engine, x):
+        # Changed features, or None when the state cannot be reused
+        state = self._state.get(model_id)
+        if state is None or state['engine'] is not engine or np.isnan(x).any():
+            return None, None
+        return state, np.flatnonzero(x != state['x'])
+
+    def _gbm(self, x):
+        flat = flat_model1()
+        scaler = registry.get('scaler')
+        state, changed = self._previous('model1', flat, x)
+        if state is None:
+            scaled = flat._check_input(scaler.transform(x.reshape(1, -1)))[0]
+            trees = np.arange(flat.n_trees)
+            leaf_values = np.empty(flat.n_trees)
+            self.full += 1
+        else:
+            scaled, leaf_values = state['scaled'], state['leaf_values']
+            # Same float64 -> float32 steps as scaler.transform + FlatGBM
+            scaled[changed] = ((x[changed] - scaler.mean_[changed]) / scaler.scale_[changed]).astype(np.float32)
+            by_feature = registry.derived('model1', 'trees_by_feature', trees_by_feature)
+            trees = np.unique(np.concatenate([by_feature[f] for f in changed])) if len(changed) else changed
+            self.incremental += 1
+        nodes = flat.roots[trees]
+        for _ in range(flat.depth):
+            nodes = np.where(scaled[flat.feature[nodes]] <= flat.threshold[nodes], flat.left[nodes], flat.right[nodes])
+        leaf_values[trees] = flat.value[nodes]
+        self.trees_evaluated += len(trees)
+        self._state['model1'] = {'engine': flat, 'x': x, 'scaled': scaled, 'leaf_values': leaf_values}
+        # Prior + tree outputs accumulated left to right, like FlatGBM
+        return np.add.accumulate(np.concatenate([[flat.init_raw], leaf_values]))[-1]
+
+    def _lr(self, x):
+        lr = fused_model2()
+        state, changed = self._previous('model2', lr, x)
+        if state is None:
+            terms = lr._impute(x)[0] * lr.weights
+            self.full += 1
+        else:
+            terms = state['terms']
+            terms[changed] = x[changed] * lr.weights[changed]
+            self.incremental += 1
+        self._state['model2'] = {'engine': lr, 'x': x, 'terms': terms}
+        return terms.sum() + lr.intercept
+
+    def stats(self):
+        """Full and incremental scorings and trees traversed so far."""
+        return {'full': self.full, 'incremental': self.incremental, 'trees_evaluated': self.trees_evaluated}
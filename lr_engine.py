@@ -0,0 +1,114 @@
+"""Fused scaler + logistic-regression scorer for the international model.
+
+The app standardizes the 23 inputs with ``scaler`` and passes the result
+through the pycaret pipeline in ``best_model_int7.9.pkl``: mean imputers
+followed by a ``LogisticRegression``.  Standardization and the logistic
+decision function are both affine, so they fold into a single weight
+vector and intercept at load time:
+
+    w = coef_ / scale_
+    b = intercept_ - w . mean_
+
+Scoring raw (unscaled) rows is then one dot product per row.  Missing
+values are replaced by the imputer's fill values, mapped back to the raw
+scale, with a vectorized mask before the dot product.
+
+The model is linear in the log-odds, so its exact per-feature attribution
+against the scaler's mean student is ``coef_ * x_scaled``, i.e.
+``w * (x - mean_)`` on raw rows: one elementwise product for a batch.
+"""
+import numpy as np
+from scipy.special import expit
+
+from model_registry import registry
+
+
+class FusedLogistic:
+    """Binary logistic regression over raw inputs with the scaler folded in."""
+
+    def __init__(self, weights, intercept, fill_values, baseline, classes):
+        self.weights = weights          # coef_ / scale_, one per raw feature
+        self.intercept = intercept      # intercept_ - weights . mean_
+        self.fill_values = fill_values  # raw-scale imputation values (NaN: none)
+        self.baseline = baseline        # scaler.mean_, the reference student
+        self.classes_ = classes
+
+    @classmethod
+    def from_pipeline(cls, scaler, pipeline):
+        steps = pipeline.steps if hasattr(pipeline, 'steps') else [('trained_model', pipeline)]
+        model = steps[-1][1]
+        if type(model).__name__ != 'LogisticRegression' or model.coef_.shape[0] != 1:
+            raise ValueError('FusedLogistic needs a binary LogisticRegression as the last step')
+
+        names = list(model.feature_names_in_) if hasattr(model, 'feature_names_in_') else None
+        n_features = model.coef_.shape[1]
+        fill_scaled = np.full(n_features, np.nan)
+        for name, step in steps[:-1]:
+            # pycaret wraps each sklearn transformer in a TransformerWrapper
+            transformer = getattr(step, 'transformer', step)
+            if type(transformer).__name__ != 'SimpleImputer':
+                raise ValueError(f'Cannot fuse pipeline step {name!r} ({type(transformer).__name__})')
+            if not hasattr(transformer, 'statistics_'):
+                continue  # imputer without columns was never fitted
+            columns = getattr(step, 'include', None) or list(transformer.feature_names_in_)
+            for column, fill in zip(columns, transformer.statistics_):
+                fill_scaled[names.index(column) if names else int(column)] = fill
+
+        mean = scaler.mean_ if scaler.with_mean else np.zeros(n_features)
+        scale = scaler.scale_ if scaler.with_std else np.ones(n_features)
+        weights = model.coef_[0] / scale
+        return cls(
+            weights=np.ascontiguousarray(weights),
+            intercept=float(model.intercept_[0] - weights @ mean),
+            fill_values=fill_scaled * scale + mean,
+            baseline=np.asarray(mean, dtype=np.float64),
+            classes=model.classes_,
+        )
+
+    def _impute(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        missing = np.isnan(X)
+        if missing.any():
+            X = np.where(missing, self.fill_values, X)
+            if np.isnan(X).any():
+                raise ValueError('Input contains NaN in a column without an imputer.')
+        return X
+
+    def decision_function(self, X):
+        """Log-odds of the positive class for raw (unscaled) rows."""
+        return self._impute(X) @ self.weights + self.intercept
+
+    @property
+    def expected_value(self):
+        """Log-odds of the baseline student (the model's intercept_)."""
+        return float(self.baseline @ self.weights + self.intercept)
+
+    def attributions(self, X):
+        """Per-feature log-odds contributions ``w * (x - baseline)``.
+
+        Shape (n_rows, n_features); each row sums to
+        ``decision_function(X) - expected_value``.
+        """
+        return (self._impute(X) - self.baseline) * self.weights
+
+    def predict_proba(self, X):
+        proba = expit(self.decision_function(X))
+        return np.column_stack([1 - proba, proba])
+
+    def predict(self, X):
+        return self.classes_[(self.decision_function(X) > 0).astype(int)]
+
+    def predict_with_proba(self, X):
+        """``(predict(X), predict_proba(X)[:, 1])`` from a single pass."""
+        scores = self.decision_function(X)
+        return self.classes_[(scores > 0).astype(int)], expit(scores)
+
+
+def fused_model2():
+    """FusedLogistic for the registry's scaler + model2, built once."""
+    # The fused weights depend on the scaler too; they are rebuilt when either changes
+    return registry.derived('model2', 'fused_lr',
+                            lambda model: FusedLogistic.from_pipeline(registry.get('scaler'), model),
+                            depends=('scaler',))
@@ -0,0 +1,148 @@
+"""Micro-batching of concurrent single-student predictions.
+
+Every Streamlit session runs in its own thread.  When several users press
+'Predict' at the same time each would score a single 1x23 row, where the
+per-call overhead dominates.  ``MicroBatcher`` collects requests for at
+most ``max_wait_ms`` (or until ``max_batch_size`` rows are waiting),
+scores them as one matrix per model and hands each session its own rows
+of the result.
+"""
+import collections
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from features import FEATURE_COLUMNS
+from gbm_engine import flat_model1
+from lr_engine import fused_model2
+from model_registry import registry
+
+# Defaults for the process-wide batcher used by the app
+MAX_BATCH_SIZE = 64
+MAX_WAIT_MS = 2.0
+
+
+class MicroBatcher:
+    """Groups concurrent requests per model and scores them together.
+
+    ``scorers`` maps a model id to a callable taking a raw feature matrix
+    and returning ``(predictions, dropout_probabilities)``.
+    """
+
+    def __init__(self, scorers, max_batch_size=MAX_BATCH_SIZE, max_wait_ms=MAX_WAIT_MS):
+        self.scorers = dict(scorers)
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._stats_lock = threading.Lock()
+        self._batch_sizes = collections.Counter()
+        self._requests = 0
+        self._queue_seconds = 0.0
+        self._max_queue_seconds = 0.0
+        self._thread = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._thread.start()
+
+    def submit(self, model_id, X):
+        """Queue raw rows for ``model_id``; returns a Future of (pred, proba)."""
+        if model_id not in self.scorers:
+            raise ValueError(f'Unknown model id: {model_id}')
+        X = np.asarray(X, dtype=np.float64)
+        if X.ndim == 1:
+            X = X.reshape(1, -1)
+        # Reject bad rows here so they cannot fail other sessions' batch
+        if X.ndim != 2 or X.shape[1] != len(FEATURE_COLUMNS):
+            raise ValueError(f'Expected rows of {len(FEATURE_COLUMNS)} features, got shape {X.shape}')
+        if not np.isfinite(X).all():
+            raise ValueError('Input contains NaN or infinity.')
+        future = Future()
+        self._queue.put((model_id, X, future, time.perf_counter()))
+        return future
+
+    def predict(self, model_id, X, timeout=None):
+        """Blocking ``submit``: returns ``(predictions, probabilities)``."""
+        return self.submit(model_id, X).result(timeout)
+
+    def _collect(self):
+        # Block for the first request, then gather more until the batch is
+        # full or the oldest request has waited max_wait
+        items = [self._queue.get()]
+        rows = len(items[0][1])
+        deadline = items[0][3] + self.max_wait
+        while rows < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            items.append(item)
+            rows += len(item[1])
+        return items
+
+    def _run(self):
+        while True:
+            items = self._collect()
+            started = time.perf_counter()
+            by_model = collections.defaultdict(list)
+            for item in items:
+                by_model[item[0]].append(item)
+            for model_id, group in by_model.items():
+                self._score_group(model_id, group)
+            self._record(items, started)
+
+    def _score_group(self, model_id, group):
+        try:
+            predictions, probabilities = self.scorers[model_id](np.vstack([item[1] for item in group]))
+        except Exception as e:
+            for item in group:
+                item[2].set_exception(e)
+            return
+        start = 0
+        for _, X, future, _ in group:
+            stop = start + len(X)
+            future.set_result((predictions[start:stop], probabilities[start:stop]))
+            start = stop
+
+    def _record(self, items, started):
+        with self._stats_lock:
+            for _, _, _, queued in items:
+                waited = started - queued
+                self._requests += 1
+                self._queue_seconds += waited
+                self._max_queue_seconds = max(self._max_queue_seconds, waited)
+            for model_id in {item[0] for item in items}:
+                self._batch_sizes[sum(len(item[1]) for item in items if item[0] == model_id)] += 1
+
+    def stats(self):
+        """Request count, batch-size histogram and queue latency."""
+        with self._stats_lock:
+            batches = sum(self._batch_sizes.values())
+            return {
+                'requests': self._requests,
+                'batches': batches,
+                'batch_sizes': dict(sorted(self._batch_sizes.items())),
+                'mean_batch_rows': sum(k * v for k, v in self._batch_sizes.items()) / batches if batches else 0.0,
+                'mean_queue_ms': 1000 * self._queue_seconds / self._requests if self._requests else 0.0,
+                'max_queue_ms': 1000 * self._max_queue_seconds,
+            }
+
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def get_batcher():
+    """Process-wide batcher over the registry's scaler, model1 and model2."""
+    global _batcher
+    with _batcher_lock:
+        if _batcher is None:
+            # Look the engines up per batch so reloaded artifacts are used
+            _batcher = MicroBatcher({
+                'model1': lambda X: flat_model1().predict_with_proba(registry.get('scaler').transform(X)),
+                'model2': lambda X: fused_model2().predict_with_proba(X),
+            })
+        return _batcher
@@ -0,0 +1,251 @@
+"""Process-wide registry for the pickled model artifacts.
+
+Streamlit re-executes the app script on every widget interaction, but
+imported modules stay in ``sys.modules`` for the life of the server
+process.  Keeping the loaded artifacts here means each pickle is read
+once per process (and again only when the file changes on disk) and
+every session shares the same objects.  A file is checked for changes at
+most once every ``CHECK_INTERVAL`` seconds.  Callers must treat the returned
+objects as read-only.
+"""
+import os
+import threading
+import time
+
+import joblib
+
+try:
+    import psutil
+except ImportError:  # psutil ships with pycaret; without it memory is not reported
+    psutil = None
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# Artifact name -> file name (relative to the repository root)
+ARTIFACTS = {
+    'model1': 'best_model_non5.pkl',     # Domestic model
+    'model2': 'best_model_int7.9.pkl',   # International model
+    'scaler': 'scaler.pkl',
+}
+
+# Seconds between two checks of an artifact file for changes
+CHECK_INTERVAL = 2.0
+
+
+class ArtifactStats:
+    """Load time and memory footprint of one artifact."""
+
+    def __init__(self, name, path, load_seconds, memory_bytes):
+        self.name = name
+        self.path = path
+        self.load_seconds = load_seconds
+        self.memory_bytes = memory_bytes
+
+    def as_dict(self):
+        return {
+            'artifact': self.name,
+            'path': self.path,
+            'load_seconds': self.load_seconds,
+            'memory_bytes': self.memory_bytes,
+        }
+
+
+class ModelRegistry:
+    """Loads each artifact at most once and hands out the shared object."""
+
+    def __init__(self, artifacts=None, base_dir=BASE_DIR, check_interval=CHECK_INTERVAL):
+        self.artifacts = dict(ARTIFACTS if artifacts is None else artifacts)
+        self.base_dir = base_dir
+        self.check_interval = check_interval
+        self._objects = {}
+        self._signatures = {}
+        self._checked = {}
+        self._derived = {}
+        self._disposers = {}
+        self._depends = {}
+        self._stats = {}
+        self._errors = {}
+        self._loading = set()
+        # One lock per artifact so a background load of one model never
+        # blocks a foreground request for another
+        self._locks = {name: threading.Lock() for name in self.artifacts}
+
+    def path(self, name):
+        return os.path.join(self.base_dir, self.artifacts[name])
+
+    def signature(self, name):
+        """``(mtime_ns, size)`` of the artifact file; changes when it is replaced.
+
+        The file is stat'ed at most once per ``check_interval`` seconds;
+        calls in between return the last value.
+        """
+        now = time.monotonic()
+        checked = self._checked.get(name)
+        if checked is not None and now - checked[0] < self.check_interval:
+            return checked[1]
+        st = os.stat(self.path(name))
+        signature = st.st_mtime_ns, st.st_size
+        self._checked[name] = now, signature
+        return signature
+
+    def get(self, name):
+        obj = self._objects.get(name)
+        signature = self.signature(name)
+        if obj is not None and self._signatures.get(name) == signature:
+            return obj
+        with self._locks[name]:
+            # Another thread may have finished loading while we waited
+            if name not in self._objects or self._signatures.get(name) != signature:
+                self._loading.add(name)
+                try:
+                    self._objects[name] = self._load(name)
+                    self._signatures[name] = signature
+                    self._errors.pop(name, None)
+                    # Structures built from the previous version are stale
+                    self._evict([k for k in self._derived if k[0] == name or name in self._depends.get(k, ())])
+                except Exception as e:
+                    self._errors[name] = e
+                    raise
+                finally:
+                    self._loading.discard(name)
+            return self._objects[name]
+
+    def derived(self, name, key, build, dispose=None, depends=()):
+        """Return ``build(artifact)``, built once and kept with the artifact.
+
+        Used for structures precomputed from a model at load time (compiled
+        trees, fused coefficients, ...).  They are rebuilt after the
+        artifact, or one of the artifacts named in ``depends``, is
+        reloaded; ``dispose(obj)`` is then called on the old one to release
+        what it holds (worker processes, ...).
+        """
+        artifact = self.get(name)
+        for dependency in depends:
+            # Reloading a changed dependency evicts what was built from it
+            self.get(dependency)
+        obj = self._derived.get((name, key))
+        if obj is not None:
+            return obj
+        with self._locks[name]:
+            if (name, key) not in self._derived:
+                self._derived[(name, key)] = build(artifact)
+                if depends:
+                    self._depends[(name, key)] = tuple(depends)
+                if dispose is not None:
+                    self._disposers[(name, key)] = dispose
+            return self._derived[(name, key)]
+
+    def _evict(self, keys):
+        for key in keys:
+            obj = self._derived.pop(key)
+            self._depends.pop(key, None)
+            dispose = self._disposers.pop(key, None)
+            if dispose is not None:
+                dispose(obj)
+
+    def peek(self, name):
+        """Return the artifact if it is already loaded, otherwise None."""
+        return self._objects.get(name)
+
+    def _load(self, name):
+        path = self.path(name)
+        before = _rss_bytes()
+        start = time.perf_counter()
+        # joblib.load reads both plain pickles and joblib dumps; the
+        # pycaret pipeline in best_model_int7.9.pkl is a joblib dump that
+        # pickle.load only partially reads.
+        obj = joblib.load(path)
+        elapsed = time.perf_counter() - start
+        after = _rss_bytes()
+        memory = None if before is None else max(after - before, 0)
+        self._stats[name] = ArtifactStats(name, path, elapsed, memory)
+        return obj
+
+    def warm_up(self, *names):
+        """Load ``names`` on a daemon thread; returns the thread (or None)."""
+        pending = [n for n in names if n not in self._objects and n not in self._loading]
+        if not pending:
+            return None
+        # Mark as loading right away so the UI never shows a stale state
+        self._loading.update(pending)
+
+        def run():
+            for name in pending:
+                try:
+                    self.get(name)
+                except Exception:
+                    # Recorded in self._errors; status() reports it
+                    pass
+                finally:
+                    self._loading.discard(name)
+
+        thread = threading.Thread(target=run, name='model-warm-up', daemon=True)
+        thread.start()
+        return thread
+
+    def status(self, name):
+        """One of 'ready', 'loading', 'failed' or 'not loaded'."""
+        if name in self._objects:
+            return 'ready'
+        if name in self._loading:
+            return 'loading'
+        if name in self._errors:
+            return 'failed'
+        return 'not loaded'
+
+    def is_loaded(self, name):
+        return name in self._objects
+
+    def stats(self):
+        """Per-artifact load statistics, in load order."""
+        return [s.as_dict() for s in self._stats.values()]
+
+
+def _rss_bytes():
+    # Resident set size of this process; the first artifact also pays for
+    # importing sklearn/pycaret, which is included in its figures.
+    if psutil is None:
+        return None
+    return psutil.Process().memory_info().rss
+
+
+registry = ModelRegistry()
+
+
+def load_models():
+    """Return ``(model1, model2, scaler)`` from the shared registry."""
+    return registry.get('model1'), registry.get('model2'), registry.get('scaler')
+
+
+# Model used for each option of the 'Select student type' radio
+STUDENT_TYPE_MODELS = {
+    'Domestic': 'model1',
+    'International': 'model2',
+}
+
+
+def load_for_student_type(student_type):
+    """Return ``(model1, model2, scaler)`` loading only what is needed now.
+
+    The scaler and the model for ``student_type`` are loaded in the
+    foreground.  The other model is warmed up on a background thread and
+    is returned as None until it is ready.
+    """
+    needed = STUDENT_TYPE_MODELS[student_type]
+    scaler = registry.get('scaler')
+    registry.get(needed)
+    registry.warm_up(*[n for n in STUDENT_TYPE_MODELS.values() if n != needed])
+    return registry.peek('model1'), registry.peek('model2'), scaler
+
+
+def readiness():
+    """Map each student type to the status of its model."""
+    return {t: registry.status(n) for t, n in STUDENT_TYPE_MODELS.items()}
+
+
+if __name__ == '__main__':
+    # Print a load report for every artifact
+    for name in registry.artifacts:
+        registry.get(name)
+    for row in registry.stats():
+        print(f"{row['artifact']:<8} {row['load_seconds'] * 1000:8.1f} ms {(row['memory_bytes'] or 0) / 1e6:8.2f} MB  {row['path']}")
@@ -0,0 +1,162 @@
+"""Multi-core scoring of model1 for large batches.
+
+sklearn's ``predict_stages`` keeps the GIL while it walks the trees, so a
+single call uses one core no matter how many threads call it.
+``ParallelGBM`` spreads a batch over a pool of worker processes instead.
+Each worker receives a copy of the engine once, when the pool starts, and
+afterwards only blocks of rows:
+
+* ``split='rows'``: each worker scores a contiguous block of rows and the
+  results are concatenated; identical to scoring the batch at once.
+* ``split='trees'``: each worker adds up a contiguous range of stages for
+  all rows and the parent adds the prior and the partial sums.  Useful
+  for batches with fewer rows than workers have cores to fill; the sum is
+  grouped differently, so the log-odds can differ in the last bits.  The
+  rows are placed in shared memory once instead of pickled to every worker.
+
+Batches smaller than ``min_rows`` are scored in the calling process.
+``get_parallel_model1`` configures the app's instance from the environment
+and shuts its pool down when model1 is reloaded:
+
+    SCORING_WORKERS=32 SCORING_SPLIT=rows streamlit run 114.py
+"""
+import multiprocessing
+import os
+import threading
+from multiprocessing import shared_memory
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy.special import expit
+
+from gbm_engine import binned_model1, predict_stages
+from model_registry import registry
+
+SPLITS = ('rows', 'trees')
+
+# Smallest batch worth sending to the pool
+MIN_PARALLEL_ROWS = 1000
+
+# Engine of the current worker process, set up once by _init_worker
+_engine = None
+
+
+def _init_worker(engine):
+    global _engine
+    _engine = engine
+
+
+def _decision_rows(X):
+    return _engine.decision_function(X)
+
+
+def _decision_stages(X, start, stop):
+    out = np.zeros((X.shape[0], 1))
+    predict_stages(_engine.estimators[start:stop], X, _engine.learning_rate, out)
+    return out[:, 0]
+
+
+def _decision_stages_shared(name, shape, start, stop):
+    # Map the parent's float32 rows instead of receiving a pickled copy
+    block = shared_memory.SharedMemory(name=name)
+    try:
+        X = np.ndarray(shape, dtype=np.float32, buffer=block.buf)
+        partial = _decision_stages(X, start, stop)
+        # No view of the buffer may outlive close()
+        del X
+        return partial
+    finally:
+        block.close()
+
+
+def _early_exit_rows(X):
+    return _engine.predict_early_exit(X)
+
+
+class ParallelGBM:
+    """Scores a FlatGBM on a pool of workers."""
+
+    def __init__(self, gbm, workers=None, split='rows', min_rows=MIN_PARALLEL_ROWS):
+        if split not in SPLITS:
+            raise ValueError(f'split must be one of {SPLITS}, got {split!r}')
+        self.gbm = gbm
+        self.workers = workers or os.cpu_count() or 1
+        self.split = split
+        self.min_rows = min_rows
+        self.classes_ = gbm.classes_
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _submit(self, fn, *args):
+        with self._lock:
+            if self._pool is None:
+                # spawn: forking a process that runs server threads is unsafe
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context('spawn'),
+                    initializer=_init_worker, initargs=(self.gbm,))
+        return self._pool.submit(fn, *args)
+
+    def decision_function(self, X):
+        X = self.gbm._check_input(X)
+        if self.workers == 1 or X.shape[0] < self.min_rows:
+            return self.gbm.decision_function(X)
+        if self.split == 'rows':
+            futures = [self._submit(_decision_rows, block) for block in np.array_split(X, self.workers)]
+            return np.concatenate([future.result() for future in futures])
+        stages = [s for s in np.array_split(np.arange(self.gbm.n_trees), self.workers) if len(s)]
+        block = shared_memory.SharedMemory(create=True, size=X.nbytes)
+        try:
+            np.ndarray(X.shape, dtype=X.dtype, buffer=block.buf)[:] = X
+            futures = [self._submit(_decision_stages_shared, block.name, X.shape, s[0], s[-1] + 1) for s in stages]
+            return self.gbm.init_raw + np.sum([future.result() for future in futures], axis=0)
+        finally:
+            block.close()
+            block.unlink()
+
+    def predict_proba(self, X):
+        proba = expit(self.decision_function(X))
+        return np.column_stack([1 - proba, proba])
+
+    def predict(self, X):
+        return self.classes_[(self.decision_function(X) >= 0).astype(int)]
+
+    def predict_with_proba(self, X):
+        """``(predict(X), predict_proba(X)[:, 1])`` from a single pass."""
+        raw = self.decision_function(X)
+        return self.classes_[(raw >= 0).astype(int)], expit(raw)
+
+    def predict_early_exit(self, X):
+        """Early-exit labels and trees evaluated, row blocks in parallel."""
+        X = self.gbm._check_input(X)
+        if self.workers == 1 or X.shape[0] < self.min_rows:
+            return self.gbm.predict_early_exit(X)
+        futures = [self._submit(_early_exit_rows, block) for block in np.array_split(X, self.workers)]
+        results = [future.result() for future in futures]
+        return np.concatenate([r[0] for r in results]), np.concatenate([r[1] for r in results])
+
+    def close(self, wait=True):
+        """Shut the pool down; it is started again on the next batch.
+
+        With ``wait=False`` the workers exit once the batches already
+        submitted are done, without blocking the caller.
+        """
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=wait)
+                self._pool = None
+
+
+def get_parallel_model1():
+    """The app's ParallelGBM over model1, configured from the environment.
+
+    ``SCORING_WORKERS`` (default: CPU cores) and ``SCORING_SPLIT`` ('rows'
+    or 'trees').
+    """
+    # Built outside derived(), which holds the registry lock while building
+    gbm = binned_model1()
+
+    def build(_):
+        workers = int(os.environ.get('SCORING_WORKERS', 0)) or None
+        return ParallelGBM(gbm, workers, split=os.environ.get('SCORING_SPLIT', 'rows'))
+    # Release the old pool's workers when a reloaded model1 replaces it
+    return registry.derived('model1', 'parallel_gbm', build, dispose=lambda engine: engine.close(wait=False))
@@ -0,0 +1,93 @@
+"""Bounded LRU cache of predictions keyed on the sidebar feature vector.
+
+Almost every sidebar input is an integer slider, so users keep coming back
+to feature vectors that were already scored.  ``PredictionCache`` keeps
+the last ``maxsize`` results keyed by ``(model id, feature tuple)``.
+Entries of a model are dropped automatically as soon as its artifact file
+(or the scaler file) changes on disk.
+"""
+import collections
+import threading
+
+from model_registry import registry
+
+# Entries kept by the process-wide cache used by the app
+CACHE_SIZE = 4096
+
+
+class PredictionCache:
+    """Thread-safe LRU cache with hit/miss/eviction counters.
+
+    ``signature`` maps a model id to a value that changes whenever the
+    model (or anything else its predictions depend on) changes.
+    """
+
+    def __init__(self, maxsize=CACHE_SIZE, signature=None):
+        self.maxsize = maxsize
+        self.signature = signature
+        self._entries = collections.OrderedDict()
+        self._signatures = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _check_signature(self, model_id):
+        # Drop a model's entries once its files no longer match
+        if self.signature is None:
+            return None
+        current = self.signature(model_id)
+        if self._signatures.get(model_id, current) != current:
+            for key in [k for k in self._entries if k[0] == model_id]:
+                del self._entries[key]
+            self.invalidations += 1
+        self._signatures[model_id] = current
+        return current
+
+    def get_or_compute(self, model_id, features, compute):
+        """Return the cached result for ``features`` or store ``compute()``."""
+        key = (model_id, tuple(float(v) for v in features))
+        with self._lock:
+            signature = self._check_signature(model_id)
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+        # Compute outside the lock; concurrent misses on one key are harmless
+        result = compute()
+        with self._lock:
+            if self._signatures.get(model_id) != signature:
+                return result  # the model changed while computing
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'invalidations': self.invalidations,
+            }
+
+
+def artifact_signature(model_id):
+    """Changes whenever the model's or the scaler's file changes."""
+    return registry.signature(model_id), registry.signature('scaler')
+
+
+prediction_cache = PredictionCache(signature=artifact_signature)
@@ -0,0 +1,231 @@
+"""Columnar, date-partitioned prediction history (Parquet).
+
+``ParquetSink`` is a ``PredictionLogger`` sink: every batch becomes one
+Parquet file under ``predictions/history/date=YYYY-MM-DD/`` with one typed
+column per feature next to the student type, model id, outcome, dropout
+probability and log timestamp.  Once a partition holds ``COMPACT_FILES``
+files they are merged into one, so a day of single-click batches does not
+leave thousands of tiny files behind.  ``read_history`` scans a date range and
+reads only the requested columns, e.g. a month of outcomes for a report:
+
+    read_history('2024-06-01', '2024-06-30', columns=['outcome', 'probability'])
+
+``query_history`` pages through filtered predictions, newest first, like
+its SQLite counterpart in prediction_store.py.  It reads row groups in
+order of their newest ``logged_at`` (from the Parquet statistics) and
+stops once no unread group can hold a row of the page, so a page costs
+about a page's worth of row groups however long the history is.
+Compaction sorts a partition by time in groups of ``ROW_GROUP_ROWS``.
+"""
+import datetime
+import itertools
+import os
+import time
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from features import CONTINUOUS_COLUMNS, FEATURE_COLUMNS
+from prediction_logger import DURABILITY, locked
+
+# History root used by the app (relative to the working directory)
+HISTORY_ROOT = os.path.join('predictions', 'history')
+
+SCHEMA = pa.schema(
+    [
+        ('logged_at', pa.timestamp('ms')),
+        ('student_type', pa.string()),
+        ('model_id', pa.string()),
+        ('outcome', pa.string()),
+        ('probability', pa.float64()),
+    ]
+    + [(column, pa.float64() if column in CONTINUOUS_COLUMNS else pa.int32()) for column in FEATURE_COLUMNS]
+    + [
+        ('flush_latency_ms', pa.float64()),
+        ('durability', pa.string()),
+    ]
+)
+
+# Hive partition key; ISO dates compare correctly as strings
+PARTITIONING = ds.partitioning(pa.schema([('date', pa.string())]), flavor='hive')
+
+# Part files a date partition may hold before the sink compacts it
+COMPACT_FILES = 32
+
+# Rows per row group of a written file; the unit query_history reads
+ROW_GROUP_ROWS = 1024
+
+
+def _part_files(folder):
+    return sorted(name for name in os.listdir(folder) if name.startswith('part-') and name.endswith('.parquet'))
+
+
+def _write_file(folder, name, table, durability):
+    # Dot-prefixed temporary name (skipped by the dataset reader), then rename
+    tmp_path = os.path.join(folder, f'.{name}.tmp')
+    with open(tmp_path, 'wb') as f:
+        pq.write_table(table, f, row_group_size=ROW_GROUP_ROWS)
+        if durability == 'fsync':
+            f.flush()
+            os.fsync(f.fileno())
+    os.replace(tmp_path, os.path.join(folder, name))
+
+
+def compact_partition(folder, durability='buffered'):
+    """Merge the part files of one date partition into a single file.
+
+    Runs under an exclusive lock on the partition, so concurrent server
+    processes never merge the same files twice; files written meanwhile are
+    left for the next compaction.  Returns the number of files merged.
+    """
+    with open(os.path.join(folder, '.compact.lock'), 'a+b') as lock:
+        with locked(lock):
+            names = _part_files(folder)
+            if len(names) < 2:
+                return 0
+            paths = [os.path.join(folder, name) for name in names]
+            table = pa.concat_tables(pq.ParquetFile(path).read() for path in paths)
+            name = f'part-{time.time_ns()}-{os.getpid()}-compact.parquet'
+            _write_file(folder, name, table.sort_by('logged_at'), durability)
+            for path in paths:
+                os.remove(path)
+            return len(paths)
+
+
+def compact_history(root=HISTORY_ROOT, durability='buffered'):
+    """Compact every date partition under ``root`` (e.g. from a nightly job)."""
+    if not os.path.isdir(root):
+        return 0
+    return sum(compact_partition(os.path.join(root, name), durability)
+               for name in sorted(os.listdir(root)) if name.startswith('date='))
+
+
+def flatten(record):
+    """Logger record -> one row of ``SCHEMA`` (features as columns)."""
+    row = {
+        'logged_at': record['Logged At'],
+        'student_type': record['Student Type'],
+        'model_id': record.get('Model'),
+        'outcome': record['Outcome'],
+        'probability': record.get('Probability'),
+        'flush_latency_ms': float(record['Flush latency ms']),
+        'durability': record['Durability'],
+    }
+    row.update({column: record['Features'][column] for column in FEATURE_COLUMNS})
+    return row
+
+
+class ParquetSink:
+    """Writes each batch as a new file in its date partition.
+
+    Files are written under a dot-prefixed temporary name (skipped by the
+    dataset reader) and renamed into place, so readers never see a partial
+    file and server processes need no lock between them.  A partition that
+    reaches ``compact_files`` files is compacted by the writer that filled it.
+    """
+
+    def __init__(self, root=HISTORY_ROOT, durability='buffered', compact_files=COMPACT_FILES):
+        if durability not in DURABILITY:
+            raise ValueError(f'durability must be one of {DURABILITY}, got {durability!r}')
+        self.root = root
+        self.durability = durability
+        self.compact_files = compact_files
+        self._sequence = itertools.count()
+
+    def write(self, records):
+        rows = sorted((flatten(record) for record in records), key=lambda row: row['logged_at'])
+        for day, group in itertools.groupby(rows, key=lambda row: row['logged_at'].date().isoformat()):
+            self._write_partition(day, list(group))
+
+    def _write_partition(self, day, rows):
+        folder = os.path.join(self.root, f'date={day}')
+        os.makedirs(folder, exist_ok=True)
+        name = f'part-{time.time_ns()}-{os.getpid()}-{next(self._sequence)}.parquet'
+        _write_file(folder, name, pa.Table.from_pylist(rows, schema=SCHEMA), self.durability)
+        if len(_part_files(folder)) >= self.compact_files:
+            compact_partition(folder, self.durability)
+
+
+def _dataset(root):
+    return ds.dataset(root, schema=SCHEMA.append(pa.field('date', pa.string())),
+                      format='parquet', partitioning=PARTITIONING)
+
+
+def _and(*conditions):
+    condition = None
+    for term in conditions:
+        if term is not None:
+            condition = term if condition is None else condition & term
+    return condition
+
+
+def _date_condition(start, end):
+    # Prunes whole date partitions
+    return _and((ds.field('date') >= str(start)) if start else None,
+                (ds.field('date') <= str(end)) if end else None)
+
+
+def read_history(start=None, end=None, columns=None, root=HISTORY_ROOT):
+    """Predictions logged between the ISO dates ``start`` and ``end``
+    (inclusive) as a DataFrame holding only ``columns`` (default: all).
+    """
+    if not os.path.isdir(root):
+        return SCHEMA.empty_table().to_pandas()[columns or SCHEMA.names]
+    return _dataset(root).to_table(columns=columns or SCHEMA.names, filter=_date_condition(start, end)).to_pandas()
+
+
+def _row_groups(dataset, condition):
+    # (newest logged_at, row group) of every row group that may match,
+    # newest first; a group without statistics is read first
+    groups = []
+    for fragment in dataset.get_fragments(filter=condition):
+        for group in fragment.split_by_row_group(filter=condition):
+            newest = group.row_groups[0].statistics.get('logged_at', {}).get('max')
+            groups.append((newest or datetime.datetime.max, group))
+    # Stable, so rows with equal timestamps keep one order across pages
+    return sorted(groups, key=lambda item: item[0], reverse=True)
+
+
+def _read_group(group, schema, condition):
+    return group.to_table(schema=schema, columns=SCHEMA.names, filter=condition)
+
+
+def query_history(student_type=None, course=None, start=None, end=None, cursor=None, page_size=50, root=HISTORY_ROOT):
+    """One page of predictions matching the filters, newest first.
+
+    Same interface as ``prediction_store.query_history``: pass the
+    ``cursor`` returned with a page to get the next one; it is None after
+    the last page.  Rows have no id here, so the cursor is the timestamp of
+    the page's last row and how many rows with that timestamp were shown.
+    """
+    if not os.path.isdir(root):
+        return [], None
+    dataset = _dataset(root)
+    row_condition = _and((ds.field('student_type') == student_type) if student_type else None,
+                         (ds.field('Course') == int(course)) if course is not None else None,
+                         (ds.field('logged_at') <= pa.scalar(cursor[0], pa.timestamp('ms'))) if cursor else None)
+    skip = cursor[1] if cursor else 0
+    # The rows shown before on this timestamp, the page and one more
+    wanted = skip + page_size + 1
+    tables, rows, oldest = [], 0, None
+    for newest, group in _row_groups(dataset, _and(_date_condition(start, end), row_condition)):
+        if oldest is not None and newest < oldest:
+            break  # every unread row is older than the rows wanted
+        tables.append(_read_group(group, dataset.schema, row_condition))
+        rows += tables[-1].num_rows
+        if rows >= wanted:
+            tables = [pa.concat_tables(tables).sort_by([('logged_at', 'descending')]).slice(0, wanted)]
+            rows, oldest = wanted, tables[0]['logged_at'][wanted - 1].as_py()
+    if not tables:
+        return [], None
+    table = pa.concat_tables(tables).sort_by([('logged_at', 'descending')])
+    page = table.slice(skip, page_size + 1).to_pylist()
+    if len(page) <= page_size:
+        return page, None
+    page = page[:page_size]
+    last = page[-1]['logged_at']
+    shown = sum(row['logged_at'] == last for row in page)
+    if cursor and last == cursor[0]:
+        shown += skip
+    return page, (last, shown)
@@ -0,0 +1,282 @@
+"""Buffered prediction log shared by all sessions and server processes.
+
+Writing the CSV from the request path (build a DataFrame, check whether
+the file exists, open, append) costs file-system I/O on every click and,
+with several sessions, interleaves rows and writes the header twice.
+``PredictionLogger.log`` only puts the record on an in-memory queue; a
+background thread drains the queue in batches and hands each batch to a
+sink.  ``CsvSink`` appends a batch under an exclusive lock on the file so
+several server processes can share one log; ``ParquetSink``
+(prediction_history.py) writes date-partitioned Parquet files and
+``SqliteSink`` (prediction_store.py) an indexed SQLite database.
+
+Every logged row carries its flush latency (time from ``log`` until the
+batch was written) and the durability setting it was written with:
+'buffered' (flushed to the OS) or 'fsync' (forced to disk).  A batch the
+sink rejects is retried by the writer with exponential backoff; ``flush``
+waits for the retries too and reports records it could not write.
+"""
+import atexit
+import contextlib
+import csv
+import datetime
+import os
+import queue
+import sys
+import threading
+import time
+
+if os.name == 'nt':
+    import msvcrt
+else:
+    import fcntl
+
+# Log file used by the app (relative to the working directory, as before)
+LOG_PATH = os.path.join('predictions', 'prediction_results.csv')
+
+# Seconds the writer waits to fill a batch, and the largest batch
+FLUSH_INTERVAL = 0.5
+MAX_BATCH = 256
+
+# Backoff between retries of a failed batch (seconds), and how many records
+# are kept for retrying while the sink keeps failing
+RETRY_DELAY = 0.5
+MAX_RETRY_DELAY = 30.0
+MAX_RETRY_RECORDS = 10 * MAX_BATCH
+
+# Seconds the interpreter waits at exit for unwritten records
+EXIT_FLUSH_TIMEOUT = 10.0
+
+DURABILITY = ('buffered', 'fsync')
+
+CSV_COLUMNS = ['Logged At', 'Student Type', 'Model', 'Outcome', 'Probability', 'Features',
+               'Flush latency ms', 'Durability']
+
+# Sinks selectable with PREDICTION_LOG_SINK
+SINKS = ('parquet', 'sqlite', 'csv')
+
+
+@contextlib.contextmanager
+def locked(f):
+    """Hold an exclusive lock on the open file ``f`` (all processes)."""
+    if os.name == 'nt':
+        # msvcrt locks a byte range from the current position; use byte 0
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+    else:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class CsvSink:
+    """Appends batches of records to a CSV file shared between processes."""
+
+    def __init__(self, path=LOG_PATH, durability='buffered'):
+        if durability not in DURABILITY:
+            raise ValueError(f'durability must be one of {DURABILITY}, got {durability!r}')
+        self.path = path
+        self.durability = durability
+
+    def _rotate_legacy(self):
+        # Older versions wrote 'Student Type,Outcome,Features' only; move
+        # such a file aside instead of appending rows with more columns
+        try:
+            with open(self.path, newline='', encoding='utf-8') as f:
+                header = next(csv.reader(f), None)
+        except FileNotFoundError:
+            return
+        if header is not None and header != CSV_COLUMNS:
+            stamp = time.strftime('%Y%m%d-%H%M%S')
+            try:
+                os.replace(self.path, f'{os.path.splitext(self.path)[0]}.{stamp}.legacy.csv')
+            except FileNotFoundError:
+                pass  # another process moved it first
+
+    def write(self, records):
+        folder = os.path.dirname(self.path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        with open(self.path, 'a+', newline='', encoding='utf-8') as f:
+            with locked(f):
+                f.seek(0, os.SEEK_END)
+                if f.tell() == 0:
+                    csv.writer(f).writerow(CSV_COLUMNS)
+                writer = csv.writer(f)
+                for record in records:
+                    row = dict(record, **{'Logged At': record['Logged At'].isoformat(timespec='milliseconds')})
+                    writer.writerow([row.get(column, '') for column in CSV_COLUMNS])
+                f.flush()
+                if self.durability == 'fsync':
+                    os.fsync(f.fileno())
+
+
+class PredictionLogger:
+    """In-memory queue drained in batches by a background writer thread."""
+
+    def __init__(self, sink, flush_interval=FLUSH_INTERVAL, max_batch=MAX_BATCH):
+        self.sink = sink
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self._queue = queue.Queue()
+        self._retry = []
+        self._lock = threading.Lock()
+        # Signalled whenever records are written or dropped
+        self._settled = threading.Condition(self._lock)
+        self._unsettled = 0
+        self.written = 0
+        self.batches = 0
+        self.errors = 0
+        self.dropped = 0
+        self.last_error = None
+        self._thread = threading.Thread(target=self._run, name='prediction-logger', daemon=True)
+        self._thread.start()
+
+    def log(self, record):
+        """Queue one prediction record (a dict); never touches the disk."""
+        record = dict(record)
+        record.setdefault('Logged At', datetime.datetime.now())
+        with self._lock:
+            self._unsettled += 1
+        self._queue.put((record, time.perf_counter()))
+
+    def _collect(self, timeout):
+        # None in the queue is flush() asking for an immediate write
+        try:
+            item = self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return []
+        if item is None:
+            return []
+        items = [item]
+        deadline = time.perf_counter() + self.flush_interval
+        while len(items) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                break
+            items.append(item)
+        return items
+
+    def _run(self):
+        delay = RETRY_DELAY
+        while True:
+            # With a failed batch waiting, wake up to retry it after the backoff
+            items = self._retry + self._collect(delay if self._retry else None)
+            if not items:
+                continue
+            if self._write(items):
+                delay = RETRY_DELAY
+            else:
+                delay = min(2 * delay, MAX_RETRY_DELAY)
+
+    def _write(self, items):
+        # The sink is called without holding _lock, so log() and stats()
+        # never wait for the disk
+        now = time.perf_counter()
+        records = []
+        for record, queued in items:
+            record['Flush latency ms'] = round(1000 * (now - queued), 3)
+            record['Durability'] = self.sink.durability
+            records.append(record)
+        try:
+            self.sink.write(records)
+        except Exception as e:
+            # Keep the newest records (bounded) for the next attempt
+            retry = items[-MAX_RETRY_RECORDS:]
+            with self._lock:
+                self.errors += 1
+                self.last_error = repr(e)
+                self.dropped += len(items) - len(retry)
+                self._retry = retry
+                self._settle(len(items) - len(retry))
+            return False
+        with self._lock:
+            self._retry = []
+            self.written += len(records)
+            self.batches += 1
+            self._settle(len(records))
+        return True
+
+    def _settle(self, count):
+        # Called with _lock held
+        self._unsettled -= count
+        if count:
+            self._settled.notify_all()
+
+    def flush(self, timeout=None):
+        """Block until every record logged so far has been written.
+
+        A batch waiting for its retry is retried at once.  Returns False if
+        ``timeout`` seconds pass with records still unwritten (the sink
+        keeps failing); records dropped after repeated failures are counted
+        in ``stats()['dropped']``.
+        """
+        self._queue.put(None)
+        with self._lock:
+            return self._settled.wait_for(lambda: self._unsettled == 0, timeout)
+
+    def _flush_at_exit(self):
+        if not self.flush(EXIT_FLUSH_TIMEOUT):
+            with self._lock:
+                print(f'prediction log: {self._unsettled} records not written ({self.last_error})', file=sys.stderr)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'written': self.written,
+                'batches': self.batches,
+                'pending': self._unsettled,
+                'errors': self.errors,
+                'dropped': self.dropped,
+                'last_error': self.last_error,
+                'durability': self.sink.durability,
+            }
+
+
+_logger = None
+_logger_lock = threading.Lock()
+
+
+def make_sink(kind, durability='buffered'):
+    if kind == 'parquet':
+        from prediction_history import ParquetSink
+        return ParquetSink(durability=durability)
+    if kind == 'sqlite':
+        from prediction_store import SqliteSink
+        return SqliteSink(durability=durability)
+    if kind == 'csv':
+        sink = CsvSink(LOG_PATH, durability)
+        sink._rotate_legacy()
+        return sink
+    raise ValueError(f'sink must be one of {SINKS}, got {kind!r}')
+
+
+def get_prediction_logger():
+    """Process-wide logger of the app.
+
+    ``PREDICTION_LOG_SINK`` picks the sink: 'parquet' (default, the
+    date-partitioned history under predictions/history), 'sqlite' (an
+    indexed database for faster history lookups) or 'csv' (``LOG_PATH``).
+    ``PREDICTION_LOG_DURABILITY=fsync`` forces every batch to disk.
+    """
+    global _logger
+    with _logger_lock:
+        if _logger is None:
+            sink = make_sink(os.environ.get('PREDICTION_LOG_SINK', 'parquet'),
+                             os.environ.get('PREDICTION_LOG_DURABILITY', 'buffered'))
+            _logger = PredictionLogger(sink)
+            atexit.register(_logger._flush_at_exit)
+        return _logger
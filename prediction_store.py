@@ -0,0 +1,125 @@
+"""SQLite prediction store for history lookups inside the app.
+
+``SqliteSink`` is a ``PredictionLogger`` sink that inserts every batch in
+one transaction into ``predictions/predictions.db``.  The database runs in
+WAL mode so several server processes can write while sessions read, and
+is indexed on ``(student_type, Course, logged_at)`` for the history tab's
+filters.  ``query_history`` returns one page of matching predictions,
+newest first, reading from where the previous page ended (keyset paging
+on ``(logged_at, id)``), so late pages cost as little as the first.
+"""
+import datetime
+import os
+import sqlite3
+
+import pyarrow as pa
+
+from prediction_history import SCHEMA, flatten
+from prediction_logger import DURABILITY
+
+# Database used by the app (relative to the working directory)
+DB_PATH = os.path.join('predictions', 'predictions.db')
+
+# Seconds a connection waits for another process's write lock
+BUSY_TIMEOUT = 30
+
+COLUMNS = SCHEMA.names
+
+
+def _sql_type(arrow_type):
+    if pa.types.is_integer(arrow_type):
+        return 'INTEGER'
+    if pa.types.is_floating(arrow_type):
+        return 'REAL'
+    return 'TEXT'
+
+
+def _quote(column):
+    # 'Order' and friends are SQL keywords
+    return f'"{column}"'
+
+
+def connect(path=DB_PATH, durability='buffered'):
+    """Open ``path`` in WAL mode, creating the table and indexes if needed."""
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT)
+    conn.execute('PRAGMA journal_mode=WAL')
+    # NORMAL is durable up to the last checkpointed commit in WAL mode; FULL
+    # syncs every commit
+    conn.execute(f"PRAGMA synchronous={'FULL' if durability == 'fsync' else 'NORMAL'}")
+    columns = ', '.join(f'{_quote(field.name)} {_sql_type(field.type)}' for field in SCHEMA)
+    with conn:
+        conn.execute(f'CREATE TABLE IF NOT EXISTS predictions (id INTEGER PRIMARY KEY, {columns})')
+        conn.execute('CREATE INDEX IF NOT EXISTS predictions_type_course_time '
+                     'ON predictions (student_type, "Course", logged_at)')
+        conn.execute('CREATE INDEX IF NOT EXISTS predictions_time ON predictions (logged_at)')
+    return conn
+
+
+class SqliteSink:
+    """Inserts each batch of records in a single transaction."""
+
+    def __init__(self, path=DB_PATH, durability='buffered'):
+        if durability not in DURABILITY:
+            raise ValueError(f'durability must be one of {DURABILITY}, got {durability!r}')
+        self.path = path
+        self.durability = durability
+        self._conn = None
+        self._insert = (f"INSERT INTO predictions ({', '.join(map(_quote, COLUMNS))}) "
+                        f"VALUES ({', '.join('?' * len(COLUMNS))})")
+
+    def write(self, records):
+        # Only the logger's writer thread calls write, so one connection
+        if self._conn is None:
+            self._conn = connect(self.path, self.durability)
+        rows = []
+        for record in records:
+            row = flatten(record)
+            row['logged_at'] = row['logged_at'].isoformat(sep=' ', timespec='milliseconds')
+            rows.append([row[column] for column in COLUMNS])
+        with self._conn:
+            self._conn.executemany(self._insert, rows)
+
+
+def query_history(student_type=None, course=None, start=None, end=None, cursor=None, page_size=50, path=DB_PATH):
+    """One page of predictions matching the filters, newest first.
+
+    ``start``/``end`` are dates (inclusive).  Pass the ``cursor`` returned
+    with a page to get the next one.  Returns ``(rows, cursor)`` with
+    ``rows`` a list of dicts and ``cursor`` None after the last page.
+    """
+    if not os.path.exists(path):
+        return [], None
+    conditions, params = [], []
+    if student_type:
+        conditions.append('student_type = ?')
+        params.append(student_type)
+    if course is not None:
+        conditions.append('"Course" = ?')
+        params.append(int(course))
+    if start:
+        conditions.append('logged_at >= ?')
+        params.append(str(start))
+    if end:
+        conditions.append('logged_at < ?')
+        params.append(str(datetime.date.fromisoformat(str(end)) + datetime.timedelta(days=1)))
+    if cursor is not None:
+        conditions.append('(logged_at, id) < (?, ?)')
+        params.extend(cursor)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ''
+    conn = sqlite3.connect(path, timeout=BUSY_TIMEOUT)
+    try:
+        # One row more than the page tells whether another page follows
+        rows = conn.execute(
+            f"SELECT id, {', '.join(map(_quote, COLUMNS))} FROM predictions {where} "
+            f'ORDER BY logged_at DESC, id DESC LIMIT ?',
+            params + [page_size + 1]).fetchall()
+    finally:
+        conn.close()
+    page = [dict(zip(COLUMNS, row[1:])) for row in rows[:page_size]]
+    if len(rows) <= page_size:
+        return page, None
+    last = rows[page_size - 1]
+    return page, (last[1 + COLUMNS.index('logged_at')], last[0])
@@ -0,0 +1,143 @@
+"""Headless batch scorer for cron jobs and other non-browser use.
+
+    python score_cli.py students.csv predictions.csv --workers 8 --chunk-rows 20000
+
+Reads the input in chunks, scores them on a pool of worker processes with
+the same scaler/model1/model2 logic as the Streamlit app and writes the
+results to a CSV file in input order.  ``--early-exit`` writes labels
+only (no probabilities) and stops each domestic row once the remaining
+trees cannot change its outcome.  ``--both-models`` scores every row with
+both models, as 18.py does for a single student.
+
+``--split rows`` or ``--split trees`` keeps reading, the international
+model and writing in this process and sends only model1's work to the
+worker pool (parallel_scoring.py), split by rows or by stage range.
+"""
+import argparse
+import collections
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from batch_scoring import CHUNK_ROWS, read_chunks, score_chunk
+
+# How the work is spread over the workers
+SPLITS = ('chunks', 'rows', 'trees')
+
+# Engines of the current worker process, set up once by _init_worker
+_engines = None
+
+
+def _init_worker():
+    global _engines
+    from gbm_engine import binned_model1
+    from lr_engine import fused_model2
+    from model_registry import registry
+    _engines = (registry.get('scaler'), binned_model1(), fused_model2())
+
+
+def _score(chunk, early_exit, both_models):
+    return score_chunk(chunk, *_engines, early_exit=early_exit, both_models=both_models)
+
+
+def _score_split(input_path, target, workers, chunk_rows, early_exit, both_models, split):
+    # Chunks scored in this process, model1 on a ParallelGBM pool
+    from gbm_engine import binned_model1
+    from lr_engine import fused_model2
+    from model_registry import registry
+    from parallel_scoring import ParallelGBM
+    gbm = ParallelGBM(binned_model1(), workers, split=split)
+    rows = distinct = 0
+    invalid = []
+    try:
+        with open(input_path, 'rb') as source:
+            for chunk in read_chunks(source, input_path, chunk_rows):
+                scored = score_chunk(chunk, registry.get('scaler'), gbm, fused_model2(), early_exit, both_models)
+                scored.to_csv(target, header=rows == 0, index=False)
+                rows += len(scored)
+                distinct += scored.attrs['distinct_rows']
+                invalid += scored.attrs['invalid_rows']
+    finally:
+        gbm.close()
+    return rows, distinct, invalid
+
+
+def score_to_csv(input_path, output_path, workers=None, chunk_rows=CHUNK_ROWS, early_exit=False, split='chunks',
+                 both_models=False):
+    """Score ``input_path`` into ``output_path``.
+
+    Returns ``(rows, distinct, invalid)``: the row count, the number of
+    distinct feature vectors actually scored (per chunk) and the 0-based
+    data rows that could not be scored (written with empty results).
+    """
+    if split not in SPLITS:
+        raise ValueError(f'split must be one of {SPLITS}, got {split!r}')
+    if early_exit and both_models:
+        raise ValueError('early_exit and both_models cannot be combined')
+    workers = workers or os.cpu_count() or 1
+    if split != 'chunks':
+        with open(output_path, 'w', newline='', encoding='utf-8') as target:
+            return _score_split(input_path, target, workers, chunk_rows, early_exit, both_models, split)
+    rows = distinct = 0
+    invalid = []
+    with open(input_path, 'rb') as source, \
+            open(output_path, 'w', newline='', encoding='utf-8') as target, \
+            ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        # Keep a bounded number of chunks in flight so memory stays flat
+        pending = collections.deque()
+
+        def write_next():
+            nonlocal rows, distinct
+            scored = pending.popleft().result()
+            scored.to_csv(target, header=rows == 0, index=False)
+            rows += len(scored)
+            distinct += scored.attrs['distinct_rows']
+            invalid.extend(scored.attrs['invalid_rows'])
+
+        for chunk in read_chunks(source, input_path, chunk_rows):
+            pending.append(pool.submit(_score, chunk, early_exit, both_models))
+            if len(pending) >= 2 * workers:
+                write_next()
+        while pending:
+            write_next()
+    return rows, distinct, invalid
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Score a CSV/Excel file of students without the Streamlit app.')
+    parser.add_argument('input', help='CSV or Excel file with the 23 feature columns')
+    parser.add_argument('output', help='CSV file to write the predictions to')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='worker processes (default: number of CPU cores)')
+    parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS,
+                        help=f'rows per chunk sent to a worker (default: {CHUNK_ROWS})')
+    parser.add_argument('--early-exit', action='store_true',
+                        help='write labels only, stopping each row once its outcome is decided')
+    parser.add_argument('--both-models', action='store_true',
+                        help='score every row with both models (international with Nationality 10 if out of range)')
+    parser.add_argument('--split', choices=SPLITS, default='chunks',
+                        help='spread whole chunks over the workers (default), or only split '
+                             "model1's work by rows or by trees")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    try:
+        rows, distinct, invalid = score_to_csv(args.input, args.output, args.workers, args.chunk_rows,
+                                               args.early_exit, args.split, args.both_models)
+    except ValueError as e:
+        print(f'Invalid input: {e}', file=sys.stderr)
+        return 1
+    elapsed = time.perf_counter() - start
+    scored = rows - len(invalid)
+    print(f'Scored {scored} students ({distinct} distinct, dedup ratio {scored / max(distinct, 1):.1f}x) '
+          f'in {elapsed:.1f} s -> {args.output}')
+    if invalid:
+        print(f'{len(invalid)} rows with missing or infinite values were not scored: '
+              f"data rows {', '.join(str(row + 1) for row in invalid[:20])}{' ...' if len(invalid) > 20 else ''}",
+              file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
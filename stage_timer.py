@@ -0,0 +1,120 @@
+"""Per-stage latency of Streamlit reruns.
+
+Each rerun creates a ``RerunTimer`` and wraps its stages (loading models,
+building ``new_data``, ``scaler.transform``, predicting, formatting the
+feature table, ``st.image`` ...) in ``timer.stage(name)``.  ``finish()``
+adds the durations to the process-wide ``metrics``, which keeps a window
+of recent samples per stage for p50/p95 and writes a snapshot in the
+Prometheus text exposition format for the node exporter's textfile
+collector.
+"""
+import collections
+import contextlib
+import os
+import threading
+import time
+
+import numpy as np
+
+# Samples kept per stage for the percentiles
+WINDOW = 1000
+
+# Metrics file scraped by the local monitoring
+METRICS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'metrics', 'app_metrics.prom')
+
+# Minimum seconds between two writes of the metrics file
+WRITE_INTERVAL = 1.0
+
+METRIC = 'dropout_app_stage_seconds'
+
+
+class StageMetrics:
+    """Thread-safe store of stage durations shared by all sessions."""
+
+    def __init__(self, window=WINDOW, path=METRICS_PATH, write_interval=WRITE_INTERVAL):
+        self.window = window
+        self.path = path
+        self.write_interval = write_interval
+        self._samples = collections.defaultdict(lambda: collections.deque(maxlen=self.window))
+        self._sums = collections.Counter()
+        self._counts = collections.Counter()
+        self._lock = threading.Lock()
+        self._last_write = 0.0
+
+    def record(self, durations):
+        """Add one rerun's ``{stage: seconds}``."""
+        with self._lock:
+            for stage, seconds in durations.items():
+                self._samples[stage].append(seconds)
+                self._sums[stage] += seconds
+                self._counts[stage] += 1
+
+    def summary(self):
+        """``{stage: {'count', 'p50_ms', 'p95_ms'}}`` over the recent window."""
+        with self._lock:
+            samples = {stage: np.array(values) for stage, values in self._samples.items()}
+            counts = dict(self._counts)
+        return {
+            stage: {
+                'count': counts[stage],
+                'p50_ms': 1000 * float(np.percentile(values, 50)),
+                'p95_ms': 1000 * float(np.percentile(values, 95)),
+            }
+            for stage, values in samples.items()
+        }
+
+    def to_prometheus(self):
+        with self._lock:
+            samples = {stage: np.array(values) for stage, values in self._samples.items()}
+            sums, counts = dict(self._sums), dict(self._counts)
+        lines = [
+            f'# HELP {METRIC} Duration of each stage of a Streamlit rerun.',
+            f'# TYPE {METRIC} summary',
+        ]
+        for stage in sorted(samples):
+            for quantile in (0.5, 0.95):
+                value = np.percentile(samples[stage], 100 * quantile)
+                lines.append(f'{METRIC}{{stage="{stage}",quantile="{quantile}"}} {value:.9f}')
+            lines.append(f'{METRIC}_sum{{stage="{stage}"}} {sums[stage]:.9f}')
+            lines.append(f'{METRIC}_count{{stage="{stage}"}} {counts[stage]}')
+        return '\n'.join(lines) + '\n'
+
+    def write(self, force=False):
+        """Replace the metrics file with a fresh snapshot (rate limited)."""
+        now = time.monotonic()
+        if not force and now - self._last_write < self.write_interval:
+            return
+        self._last_write = now
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        # Write then rename so a scrape never sees a half-written file
+        tmp_path = f'{self.path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus())
+        os.replace(tmp_path, self.path)
+
+
+metrics = StageMetrics()
+
+
+class RerunTimer:
+    """Collects the stage durations of one rerun."""
+
+    def __init__(self, store=metrics):
+        self.store = store
+        self.durations = {}
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[name] = self.durations.get(name, 0.0) + time.perf_counter() - start
+
+    def finish(self):
+        """Record this rerun's stages and refresh the metrics file."""
+        self.store.record(self.durations)
+        try:
+            self.store.write()
+        except OSError:
+            pass  # metrics must never break the app
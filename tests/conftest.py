@@ -0,0 +1,24 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# The modules live at the repository root, next to the app scripts
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from features import FEATURE_COLUMNS  # noqa: E402
+from model_registry import registry  # noqa: E402
+from what_if import feature_values  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def raw_rows():
+    """2000 synthetic students drawn from the sliders' ranges."""
+    rng = np.random.default_rng(2024)
+    return np.column_stack([rng.choice(feature_values(column), 2000) for column in FEATURE_COLUMNS])
+
+
+@pytest.fixture(scope='session')
+def scaled_rows(raw_rows):
+    return registry.get('scaler').transform(raw_rows)
@@ -0,0 +1,24 @@
+import numpy as np
+
+from gbm_shap import PathShap
+from lr_engine import FusedLogistic
+from model_registry import registry
+
+
+def test_tree_shap_adds_up_to_model1_log_odds(scaled_rows):
+    model = registry.get('model1')
+    explainer = PathShap.from_estimator(model)
+    X = scaled_rows[:100]
+    values = explainer.shap_values(X)
+    assert values.shape == X.shape
+    np.testing.assert_allclose(values.sum(1) + explainer.expected_value, model.decision_function(X),
+                               rtol=0, atol=1e-9)
+
+
+def test_logistic_attributions_add_up_to_model2_log_odds(raw_rows):
+    engine = FusedLogistic.from_pipeline(registry.get('scaler'), registry.get('model2'))
+    values = engine.attributions(raw_rows)
+    np.testing.assert_allclose(values.sum(1) + engine.expected_value, engine.decision_function(raw_rows),
+                               rtol=0, atol=1e-9)
+    # The mean student gets no attribution at all
+    np.testing.assert_array_equal(engine.attributions(engine.baseline), 0)
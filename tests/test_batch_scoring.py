@@ -0,0 +1,42 @@
+import numpy as np
+import pandas as pd
+
+from batch_scoring import score_chunk, validate_columns
+from features import FEATURE_COLUMNS
+from gbm_engine import binned_model1
+from lr_engine import fused_model2
+from model_registry import registry
+
+
+def score(frame, **kwargs):
+    return score_chunk(frame, registry.get('scaler'), binned_model1(), fused_model2(), **kwargs)
+
+
+def test_validate_columns_shares_the_chunks_data(raw_rows):
+    frame = pd.DataFrame(raw_rows[:100], columns=FEATURE_COLUMNS)
+    chunk, X = validate_columns(frame)
+    np.testing.assert_array_equal(X, raw_rows[:100])
+    assert np.shares_memory(chunk['Age'].to_numpy(), frame['Age'].to_numpy())
+    chunk['Outcome'] = 'Graduate'
+    assert 'Outcome' not in frame.columns
+
+
+def test_invalid_rows_are_reported_not_fatal(raw_rows):
+    X = raw_rows[:200].copy()
+    X[:, FEATURE_COLUMNS.index('Nationality')] = 1
+    X[100:, FEATURE_COLUMNS.index('Nationality')] = 5
+    expected = score(pd.DataFrame(X, columns=FEATURE_COLUMNS))
+    # A missing value in a domestic row, an infinity, and a missing value
+    # in an international row, which model2 imputes
+    X[3, FEATURE_COLUMNS.index('Age')] = np.nan
+    X[150, FEATURE_COLUMNS.index('GDP')] = np.inf
+    X[120, FEATURE_COLUMNS.index('Age')] = np.nan
+    scored = score(pd.DataFrame(X, columns=FEATURE_COLUMNS))
+    assert scored.attrs['invalid_rows'] == [3, 150]
+    assert scored.loc[[3, 150], ['Student Type', 'Outcome', 'Dropout probability']].isna().all().all()
+    assert scored.loc[120, 'Student Type'] == 'International'
+    valid = ~scored.index.isin([3, 120, 150])
+    pd.testing.assert_frame_equal(scored.loc[valid, ['Student Type', 'Outcome', 'Dropout probability']],
+                                  expected.loc[valid, ['Student Type', 'Outcome', 'Dropout probability']])
+    # With both models every row goes through model1
+    assert score(pd.DataFrame(X, columns=FEATURE_COLUMNS), both_models=True).attrs['invalid_rows'] == [3, 120, 150]
@@ -0,0 +1,61 @@
+import itertools
+
+import numpy as np
+import pytest
+
+from counterfactual import ACTIONABLE, _distance, _predict, counterfactual
+from features import FEATURE_COLUMNS
+from what_if import feature_values
+
+
+def brute_force(x, model_id, n_changes):
+    # Every change of n_changes actionable features over all slider values,
+    # with the smallest total distance of those predicted Graduate
+    best = None
+    for columns in itertools.combinations(ACTIONABLE, n_changes):
+        for values in itertools.product(*(feature_values(column) for column in columns)):
+            change = [(column, value) for column, value in zip(columns, values)
+                      if value != x[FEATURE_COLUMNS.index(column)]]
+            if len(change) < n_changes:
+                continue
+            X = x.copy()
+            for column, value in change:
+                X[FEATURE_COLUMNS.index(column)] = value
+            if _predict(model_id, X.reshape(1, -1))[0][0] == 0:
+                cost = sum(_distance(column, x[FEATURE_COLUMNS.index(column)], value) for column, value in change)
+                best = cost if best is None else min(best, cost)
+    return best
+
+
+@pytest.fixture(scope='module')
+def dropout_rows(raw_rows):
+    labels, _ = _predict('model2', raw_rows)
+    return raw_rows[labels == 1]
+
+
+def test_counterfactual_is_minimal_for_model2(dropout_rows):
+    levels = set()
+    for x in dropout_rows[:40]:
+        result = counterfactual(x, 'model2', time_budget=float('inf'))
+        assert result['changes'], 'every Dropout row here has a counterfactual'
+        n_changes = len(result['changes'])
+        levels.add(n_changes)
+        # No change of fewer features predicts Graduate
+        for fewer in range(1, n_changes):
+            assert brute_force(x, 'model2', fewer) is None
+        X = x.copy()
+        for column, old, new in result['changes']:
+            assert column in ACTIONABLE and old == x[FEATURE_COLUMNS.index(column)]
+            X[FEATURE_COLUMNS.index(column)] = new
+        labels, probabilities = _predict('model2', X.reshape(1, -1))
+        assert labels[0] == 0
+        assert result['probability'] == pytest.approx(probabilities[0], rel=0, abs=1e-12)
+        cost = sum(_distance(column, old, new) for column, old, new in result['changes'])
+        assert cost == pytest.approx(brute_force(x, 'model2', n_changes), rel=0, abs=1e-12)
+    assert levels == {1, 2}
+
+
+def test_counterfactual_of_a_graduate_is_empty(raw_rows):
+    labels, _ = _predict('model2', raw_rows)
+    result = counterfactual(raw_rows[np.flatnonzero(labels == 0)[0]], 'model2')
+    assert result['changes'] == [] and result['rows_scored'] == 1
@@ -0,0 +1,80 @@
+import copy
+
+import numpy as np
+
+from gbm_engine import FLAT_MAX_ROWS, BinnedGBM, FlatGBM, _score_codes, predict_stages, predict_stages_fallback
+from model_registry import registry
+
+
+def test_flat_gbm_is_bit_identical_to_model1(scaled_rows):
+    model = registry.get('model1')
+    engine = FlatGBM.from_estimator(model)
+    expected = model.decision_function(scaled_rows)
+    # predict_stages for batches, the NumPy traversal for a few rows
+    np.testing.assert_array_equal(engine.decision_function(scaled_rows), expected)
+    np.testing.assert_array_equal(engine.decision_function(scaled_rows[:FLAT_MAX_ROWS]), expected[:FLAT_MAX_ROWS])
+    np.testing.assert_array_equal(engine.predict(scaled_rows), model.predict(scaled_rows))
+
+
+def test_predict_stages_fallback_is_bit_identical(scaled_rows):
+    engine = FlatGBM.from_estimator(registry.get('model1'))
+    X = engine._check_input(scaled_rows[:200])
+    compiled = np.full((len(X), 1), engine.init_raw)
+    fallback = compiled.copy()
+    predict_stages(engine.estimators, X, engine.learning_rate, compiled)
+    predict_stages_fallback(engine.estimators, X, engine.learning_rate, fallback)
+    np.testing.assert_array_equal(fallback, compiled)
+
+
+def test_binned_gbm_is_bit_identical_to_model1(scaled_rows):
+    model = registry.get('model1')
+    engine = BinnedGBM.from_estimator(model)
+    np.testing.assert_array_equal(engine.decision_function(scaled_rows), model.decision_function(scaled_rows))
+
+
+def test_bin_codes_decide_every_split_like_the_values(scaled_rows):
+    # The uncompiled kernel on a few rows, with blocks smaller than the batch
+    engine = BinnedGBM.from_estimator(registry.get('model1'))
+    X = scaled_rows[:40]
+    out = np.empty(len(X))
+    getattr(_score_codes, 'py_func', _score_codes)(engine.bin(X), engine.split_feature, engine.split_code,
+                                                   engine.leaf_value, engine.init_raw, 16, out)
+    np.testing.assert_array_equal(out, engine._decision_block(engine._check_input(X)))
+
+
+def shifted_model1(shift):
+    # model1 never predicts Dropout on its own; moving the prior gives a
+    # mix of both labels while keeping every tree
+    engine = FlatGBM.from_estimator(registry.get('model1'))
+    engine.init_raw += shift
+    return engine
+
+
+def test_early_exit_labels_match_predict_with_both_classes(scaled_rows):
+    engine = shifted_model1(1.0)
+    expected = engine.predict(scaled_rows)
+    assert 0 < (expected == 1).sum() < len(expected)
+    labels, trees = engine.predict_early_exit(scaled_rows)
+    np.testing.assert_array_equal(labels, expected)
+    assert trees.min() < engine.n_trees
+
+
+def test_early_exit_labels_match_predict_near_the_boundary(scaled_rows):
+    # Put the median row on 0, so many rows are decided late or not at all
+    engine = shifted_model1(0.0)
+    engine.init_raw -= np.median(engine.decision_function(scaled_rows))
+    labels, _ = engine.predict_early_exit(scaled_rows)
+    np.testing.assert_array_equal(labels, engine.predict(scaled_rows))
+
+
+def test_early_exit_labels_rows_by_the_deciding_bound(scaled_rows):
+    # Later trees that only add log-odds decide rows positive while their
+    # partial sum is still negative
+    model = copy.deepcopy(registry.get('model1'))
+    for estimator in model.estimators_[10:, 0]:
+        estimator.tree_.value[:, 0, 0] += 5.0
+    engine = FlatGBM.from_estimator(model)
+    engine.init_raw -= np.median(engine.decision_function(scaled_rows))
+    assert engine._exit_bounds()[0][10] > 0
+    labels, _ = engine.predict_early_exit(scaled_rows)
+    np.testing.assert_array_equal(labels, engine.predict(scaled_rows))
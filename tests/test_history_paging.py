@@ -0,0 +1,83 @@
+import datetime
+
+import pytest
+
+import prediction_history
+import prediction_store
+from features import FEATURE_COLUMNS
+from prediction_history import ParquetSink
+from prediction_store import SqliteSink
+
+
+def records(count):
+    # Three records per millisecond, so pages end inside runs of equal
+    # timestamps; the last ones fall on the next day
+    start = datetime.datetime(2024, 6, 1, 23, 59, 59, 990000)
+    for i in range(count):
+        yield {
+            'Logged At': start + datetime.timedelta(milliseconds=i // 3),
+            'Student Type': ('Domestic', 'International')[i % 2],
+            'Model': 'model1',
+            'Outcome': 'Graduate',
+            'Probability': i / count,
+            'Features': {column: i % 5 + 1 for column in FEATURE_COLUMNS},
+            'Flush latency ms': 1.0,
+            'Durability': 'buffered',
+        }
+
+
+@pytest.fixture(params=['sqlite', 'parquet'])
+def store(request, tmp_path):
+    if request.param == 'sqlite':
+        sink = SqliteSink(path=str(tmp_path / 'predictions.db'))
+        return sink, lambda **kwargs: prediction_store.query_history(path=sink.path, **kwargs)
+    sink = ParquetSink(root=str(tmp_path / 'history'), compact_files=4)
+    return sink, lambda **kwargs: prediction_history.query_history(root=sink.root, **kwargs)
+
+
+def all_pages(query, **filters):
+    pages, cursor = [], None
+    while True:
+        rows, cursor = query(cursor=cursor, page_size=7, **filters)
+        pages.append(rows)
+        if cursor is None:
+            return pages
+
+
+def test_keyset_pages_cover_every_row_once_newest_first(store):
+    sink, query = store
+    batch = list(records(100))
+    for i in range(0, len(batch), 10):
+        sink.write(batch[i:i + 10])
+    pages = all_pages(query)
+    rows = [row for page in pages for row in page]
+    assert len(pages) == 15 and all(len(page) == 7 for page in pages[:-1])
+    assert sorted(row['probability'] for row in rows) == sorted(i / 100 for i in range(100))
+    stamps = [str(row['logged_at']) for row in rows]
+    assert stamps == sorted(stamps, reverse=True)
+
+    international = [row for page in all_pages(query, student_type='International', course=2) for row in page]
+    assert {row['student_type'] for row in international} == {'International'}
+    assert len(international) == sum(i % 2 == 1 and i % 5 == 1 for i in range(100))
+
+
+def test_parquet_page_reads_only_the_newest_row_groups(tmp_path, monkeypatch):
+    monkeypatch.setattr(prediction_history, 'ROW_GROUP_ROWS', 10)
+    sink = ParquetSink(root=str(tmp_path / 'history'), compact_files=4)
+    batch = list(records(1000))
+    for i in range(0, len(batch), 10):
+        sink.write(batch[i:i + 10])
+    reads = []
+    read_group = prediction_history._read_group
+    monkeypatch.setattr(prediction_history, '_read_group', lambda *args: reads.append(1) or read_group(*args))
+
+    def query(**kwargs):
+        return prediction_history.query_history(root=sink.root, **kwargs)
+
+    rows, cursor = query(page_size=7)
+    assert len(rows) == 7 and cursor is not None
+    assert len(reads) <= 2
+    rows = [row for page in all_pages(query) for row in page]
+    assert sorted(row['probability'] for row in rows) == sorted(i / 1000 for i in range(1000))
+    stamps = [str(row['logged_at']) for row in rows]
+    assert stamps == sorted(stamps, reverse=True)
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from features import FEATURE_COLUMNS
+from gbm_engine import flat_model1
+from incremental import IncrementalScorer
+from lr_engine import fused_model2
+from model_registry import registry
+from what_if import feature_values
+
+
+def slider_moves(raw_rows, n_moves):
+    # One student whose sliders move one at a time, like reruns of the app
+    rng = np.random.default_rng(7)
+    x = raw_rows[0].copy()
+    for _ in range(n_moves):
+        i = rng.integers(len(FEATURE_COLUMNS))
+        x[i] = rng.choice(feature_values(FEATURE_COLUMNS[i]))
+        yield x.copy()
+
+
+def test_incremental_model1_is_bit_identical_to_a_full_prediction(raw_rows):
+    scorer = IncrementalScorer()
+    flat = flat_model1()
+    for x in slider_moves(raw_rows, 200):
+        label, proba = scorer.predict_with_proba('model1', x)
+        labels, probas = flat.predict_with_proba(registry.get('scaler').transform(x.reshape(1, -1)))
+        assert label == labels[0]
+        assert proba == probas[0]
+    stats = scorer.stats()
+    assert stats['full'] == 1 and stats['incremental'] == 199
+    assert stats['trees_evaluated'] < 200 * flat.n_trees
+
+
+def test_incremental_state_does_not_follow_the_callers_array(raw_rows):
+    scorer = IncrementalScorer()
+    x = raw_rows[0].copy()
+    _, before = scorer.predict_with_proba('model1', x)
+    # Changed in place, then scored again: the scorer must see the change
+    debtor = FEATURE_COLUMNS.index('Debtor')
+    x[debtor] = 1 - x[debtor]
+    _, proba = scorer.predict_with_proba('model1', x)
+    _, probas = flat_model1().predict_with_proba(registry.get('scaler').transform(x.reshape(1, -1)))
+    assert proba == probas[0] != before
+
+
+def test_incremental_model2_matches_a_full_prediction(raw_rows):
+    scorer = IncrementalScorer()
+    for x in slider_moves(raw_rows, 200):
+        label, proba = scorer.predict_with_proba('model2', x)
+        labels, probas = fused_model2().predict_with_proba(x)
+        assert label == labels[0]
+        assert proba == pytest.approx(probas[0], rel=0, abs=1e-12)
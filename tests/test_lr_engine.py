@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+
+from features import FEATURE_COLUMNS
+from lr_engine import FusedLogistic
+from model_registry import registry
+
+
+def fused():
+    return FusedLogistic.from_pipeline(registry.get('scaler'), registry.get('model2'))
+
+
+def test_fused_logistic_matches_scaler_and_pipeline(raw_rows, scaled_rows):
+    pipeline = registry.get('model2')
+    X = pd.DataFrame(scaled_rows, columns=FEATURE_COLUMNS)
+    engine = fused()
+    np.testing.assert_allclose(engine.predict_proba(raw_rows), pipeline.predict_proba(X), rtol=0, atol=1e-12)
+    np.testing.assert_array_equal(engine.predict(raw_rows), pipeline.predict(X))
+    labels, proba = engine.predict_with_proba(raw_rows)
+    np.testing.assert_array_equal(labels, engine.predict(raw_rows))
+    np.testing.assert_array_equal(proba, engine.predict_proba(raw_rows)[:, 1])
+
+
+def test_fused_logistic_imputes_missing_values(raw_rows, scaled_rows):
+    pipeline = registry.get('model2')
+    raw, scaled = raw_rows[:50].copy(), scaled_rows[:50].copy()
+    raw[::2, 3] = np.nan
+    scaled[::2, 3] = np.nan
+    X = pd.DataFrame(scaled, columns=FEATURE_COLUMNS)
+    np.testing.assert_allclose(fused().predict_proba(raw), pipeline.predict_proba(X), rtol=0, atol=1e-12)
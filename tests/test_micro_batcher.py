@@ -0,0 +1,16 @@
+import numpy as np
+import pytest
+
+from micro_batcher import MicroBatcher
+
+
+def test_submit_rejects_non_finite_rows():
+    batcher = MicroBatcher({'model1': lambda X: (np.zeros(len(X), dtype=int), np.zeros(len(X)))})
+    row = np.ones(23)
+    for bad in (np.nan, np.inf, -np.inf):
+        row[6] = bad
+        with pytest.raises(ValueError, match='NaN or infinity'):
+            batcher.submit('model1', row)
+    row[6] = 1
+    prediction, probability = batcher.predict('model1', row, timeout=5)
+    assert prediction.tolist() == [0] and probability.tolist() == [0.0]
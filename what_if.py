@@ -0,0 +1,92 @@
+"""What-if analysis: the dropout risk of one student over a slider's range.
+
+Instead of dragging a slider back and forth (one rerun per position),
+``sweep`` copies the current student once per value of the chosen
+feature and scores the whole matrix with a single batched call per model.
+``risk_surface`` does the same for every combination of two features
+(First x Second is 19 x 13 = 247 cells) and caches the surfaces on the
+student's other features, so changing anything else that does not enter
+the grid never re-evaluates it.
+"""
+import numpy as np
+import pandas as pd
+
+from features import CONTINUOUS_COLUMNS, FEATURE_COLUMNS, SLIDER_RANGES
+from gbm_engine import flat_model1
+from lr_engine import fused_model2
+from model_registry import registry
+from prediction_cache import PredictionCache, artifact_signature
+
+# Points used for the float sliders (integer sliders use every value)
+CONTINUOUS_POINTS = 50
+
+# Surfaces kept, keyed on the features outside the grid
+SURFACE_CACHE_SIZE = 256
+
+
+def feature_values(column):
+    """Every value of an integer slider, or an even grid over a float one."""
+    low, high = SLIDER_RANGES[column]
+    if column in CONTINUOUS_COLUMNS:
+        return np.linspace(low, high, CONTINUOUS_POINTS)
+    return np.arange(low, high + 1, dtype=np.float64)
+
+
+def vary(x, column, values):
+    """Rows of the raw student ``x`` with ``column`` set to each of ``values``."""
+    X = np.tile(np.asarray(x, dtype=np.float64), (len(values), 1))
+    X[:, FEATURE_COLUMNS.index(column)] = values
+    return X
+
+
+def _score_both(X):
+    # Dropout probability of each model for raw rows X
+    domestic = flat_model1().predict_proba(registry.get('scaler').transform(X))[:, 1]
+    international = fused_model2().predict_proba(X)[:, 1]
+    return domestic, international
+
+
+def sweep(x, column, values=None):
+    """Dropout probability of both models over the values of ``column``.
+
+    Returns a DataFrame indexed by the feature value with one column per
+    model ('Domestic model', 'International model').
+    """
+    values = feature_values(column) if values is None else np.asarray(values, dtype=np.float64)
+    domestic, international = _score_both(vary(x, column, values))
+    frame = pd.DataFrame({'Domestic model': domestic, 'International model': international}, index=values)
+    frame.index.name = column
+    return frame
+
+
+def _surfaces_signature(_):
+    return artifact_signature('model1'), artifact_signature('model2')
+
+
+surface_cache = PredictionCache(maxsize=SURFACE_CACHE_SIZE, signature=_surfaces_signature)
+
+
+def risk_surface(x, rows='First', columns='Second'):
+    """Dropout probability of both models over every (rows, columns) pair.
+
+    Returns ``{'Domestic model': frame, 'International model': frame}``
+    with one frame row per value of ``rows`` and one column per value of
+    ``columns``.  Cached on the other features of ``x``.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    i, j = FEATURE_COLUMNS.index(rows), FEATURE_COLUMNS.index(columns)
+    others = np.delete(x, [i, j])
+
+    def compute():
+        row_values, column_values = feature_values(rows), feature_values(columns)
+        grid_rows, grid_columns = np.meshgrid(row_values, column_values, indexing='ij')
+        X = np.tile(x, (grid_rows.size, 1))
+        X[:, i], X[:, j] = grid_rows.ravel(), grid_columns.ravel()
+        surfaces = {}
+        for name, probability in zip(('Domestic model', 'International model'), _score_both(X)):
+            frame = pd.DataFrame(probability.reshape(grid_rows.shape), index=row_values, columns=column_values)
+            frame.index.name, frame.columns.name = rows, columns
+            surfaces[name] = frame
+        return surfaces
+
+    return surface_cache.get_or_compute(f'surface:{rows}:{columns}', others, compute)